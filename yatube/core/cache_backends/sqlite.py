@@ -0,0 +1,274 @@
+"""Кэш в файле SQLite (WAL), общий для всех процессов на одной машине.
+
+Настройка::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube_cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'MAX_SIZE': 256 * 1024 * 1024,
+                'SERIALIZER': 'core.cache_backends.sqlite.PickleSerializer',
+            },
+        }
+    }
+
+При превышении MAX_ENTRIES или MAX_SIZE (в байтах) вытесняются записи,
+которые дольше всех не читали.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+# Время последнего чтения обновляется не чаще раза в секунду на ключ,
+# иначе каждое чтение превращалось бы в запись.
+ACCESS_RESOLUTION = 1.0
+BUSY_TIMEOUT = 5.0
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats SET entries = entries + 1, size = size + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats SET entries = entries - 1, size = size - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_stats SET size = size - OLD.size + NEW.size;
+END;
+'''
+UPSERT = '''
+INSERT INTO cache (key, value, expires, accessed, size)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    value = excluded.value,
+    expires = excluded.expires,
+    accessed = excluded.accessed,
+    size = excluded.size
+'''
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+class PickleSerializer:
+    def dumps(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data):
+        return pickle.loads(data)
+
+
+class JSONSerializer:
+    def dumps(self, value):
+        return json.dumps(value, cls=DjangoJSONEncoder).encode()
+
+    def loads(self, data):
+        return json.loads(data.decode())
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = options.get('MAX_SIZE')
+        self._serializer = import_string(options.get(
+            'SERIALIZER', 'core.cache_backends.sqlite.PickleSerializer'))()
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё у каждого потока и у каждого процесса: после
+        # fork() унаследованное соединение использовать нельзя.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _keys(self, keys, version):
+        made = {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            self.validate_key(made_key)
+            made[made_key] = key
+        return made
+
+    def _row(self, key, value, timeout, now):
+        data = self._serializer.dumps(value)
+        return (
+            key, data, self.get_backend_timeout(timeout), now, len(data))
+
+    def _touch_accessed(self, connection, rows, now):
+        stale = [
+            (now, key) for key, accessed in rows
+            if now - accessed > ACCESS_RESOLUTION
+        ]
+        if stale:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', stale)
+
+    def _cull(self, connection, now):
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        too_big = self._max_size and size > self._max_size
+        if entries <= self._max_entries and not too_big:
+            return
+        connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        entries, size = connection.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        if entries > self._max_entries:
+            count = entries // self._cull_frequency if self._cull_frequency \
+                else entries
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(count, entries - self._max_entries),))
+        while self._max_size and size > self._max_size:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(entries // 10, 1),))
+            entries, size = connection.execute(
+                'SELECT entries, size FROM cache_stats').fetchone()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                f'DELETE FROM cache WHERE key = ? AND NOT {ALIVE}',
+                (key, now))
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache '
+                '(key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)',
+                self._row(key, value, timeout, now)).rowcount
+            if added:
+                self._cull(connection, now)
+        return bool(added)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            f'SELECT value, accessed FROM cache WHERE key = ? AND {ALIVE}',
+            (key, now)).fetchone()
+        if row is None:
+            return default
+        self._touch_accessed(connection, [(key, row[1])], now)
+        return self._serializer.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        made = self._keys(keys, version)
+        if not made:
+            return {}
+        now = time.time()
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT key, value, accessed FROM cache WHERE key IN ({}) '
+            'AND {}'.format(', '.join('?' * len(made)), ALIVE),
+            (*made, now)).fetchall()
+        self._touch_accessed(
+            connection, [(key, accessed) for key, _, accessed in rows], now)
+        return {
+            made[key]: self._serializer.loads(value)
+            for key, value, _ in rows
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        rows = [
+            self._row(key, data[original], timeout, now)
+            for key, original in self._keys(data, version).items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection, now)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        return bool(self._connection().execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), key, now)).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        # BEGIN IMMEDIATE берёт блокировку записи сразу, поэтому
+        # чтение и запись нового значения атомарны между процессами.
+        with self._transaction() as connection:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {ALIVE}',
+                (key, now)).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = self._serializer.loads(row[0]) + delta
+            data = self._serializer.dumps(value)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?', (data, len(data), now, key))
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (key, time.time())).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        made = list(self._keys(keys, version))
+        if made:
+            self._connection().execute(
+                'DELETE FROM cache WHERE key IN ({})'.format(
+                    ', '.join('?' * len(made))), made)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
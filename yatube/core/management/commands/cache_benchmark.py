@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends.sqlite import SQLiteCache
+
+
+def make_backends(directory, max_entries):
+    params = {'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    return {
+        'locmem': LocMemCache('benchmark', params),
+        'filebased': FileBasedCache(os.path.join(directory, 'files'), params),
+        'sqlite': SQLiteCache(
+            os.path.join(directory, 'cache.sqlite3'), params),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает SQLiteCache с LocMemCache и FileBasedCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--value-size', type=int, default=2048)
+
+    def measure(self, name, operation, count):
+        start = time.perf_counter()
+        operation()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'  {name:<10} {count / elapsed:>12.0f} оп/с'
+            f' {elapsed * 1e6 / count:>10.1f} мкс/оп')
+
+    def handle(self, *args, **options):
+        count = options['keys']
+        value = 'x' * options['value_size']
+        keys = [f'key-{i}' for i in range(count)]
+        batch = keys[:10]
+        with tempfile.TemporaryDirectory() as directory:
+            for name, cache in make_backends(directory, count * 2).items():
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.measure(
+                    'set', lambda: [cache.set(key, value) for key in keys],
+                    count)
+                self.measure(
+                    'get', lambda: [cache.get(key) for key in keys], count)
+                self.measure(
+                    'get_many',
+                    lambda: [cache.get_many(batch) for _ in keys], count)
+                cache.set('counter', 0)
+                self.measure(
+                    'incr', lambda: [cache.incr('counter') for _ in keys],
+                    count)
+                self.measure(
+                    'miss', lambda: [cache.get(f'{key}-miss') for key in keys],
+                    count)
+                cache.clear()
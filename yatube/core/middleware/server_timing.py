@@ -0,0 +1,215 @@
+"""Замеры запроса: SQL, шаблоны, кэш и миниатюры.
+
+Итог уходит в заголовок Server-Timing и в строку JSON лога
+yatube.timing с именем view, счётчики из count() — только в лог.
+Замеряется доля запросов из настройки SERVER_TIMING_SAMPLE_RATE
+(от 0 до 1); у остальных запросов обёртки только проверяют, что
+замера нет, и сразу передают вызов дальше.
+
+Настройка::
+
+    MIDDLEWARE = [
+        'core.middleware.server_timing.ServerTimingMiddleware',
+        ...
+    ]
+    SERVER_TIMING_SAMPLE_RATE = 0.05
+"""
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('yatube.timing')
+current = ContextVar('server_timing', default=None)
+MISSING = object()
+# Порядок метрик в заголовке.
+METRICS = ('sql', 'template', 'cache', 'thumbnail')
+
+
+class Timings:
+    def __init__(self):
+        self.durations = dict.fromkeys(METRICS, 0.0)
+        self.counts = dict.fromkeys(METRICS, 0)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.counters = Counter()
+        self.template_depth = 0
+
+    def add(self, metric, seconds):
+        self.durations[metric] += seconds
+        self.counts[metric] += 1
+
+    def header(self, total):
+        parts = [
+            f'{metric};dur={self.durations[metric] * 1000:.1f}'
+            f';desc="{self.describe(metric)}"'
+            for metric in METRICS if self.counts[metric]
+        ]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def describe(self, metric):
+        if metric == 'cache':
+            return f'hits={self.cache_hits} misses={self.cache_misses}'
+        return f'{self.counts[metric]}'
+
+    def record(self, request, response, total):
+        match = request.resolver_match
+        return {
+            'view': match.view_name if match else None,
+            'method': request.method,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            **{
+                f'{metric}_ms': round(self.durations[metric] * 1000, 2)
+                for metric in METRICS
+            },
+            'sql_count': self.counts['sql'],
+            'template_count': self.counts['template'],
+            'thumbnail_count': self.counts['thumbnail'],
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            **self.counters,
+        }
+
+
+@contextmanager
+def timed(metric):
+    """Добавляет время блока к метрике, если запрос замеряется."""
+    timings = current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(metric, time.perf_counter() - start)
+
+
+def count(name):
+    """Прибавляет единицу к счётчику name в логе замеряемого запроса."""
+    timings = current.get()
+    if timings is not None:
+        timings.counters[name] += 1
+
+
+def time_sql(execute, sql, params, many, context):
+    with timed('sql'):
+        return execute(sql, params, many, context)
+
+
+def patch_template_render():
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, context):
+        timings = current.get()
+        # Вложенные include считаются внутри внешнего шаблона.
+        if timings is None or timings.template_depth:
+            return render(self, context)
+        timings.template_depth += 1
+        try:
+            with timed('template'):
+                return render(self, context)
+        finally:
+            timings.template_depth -= 1
+
+    Template.render = timed_render
+
+
+def patch_cache(backend):
+    get, get_many = backend.get, backend.get_many
+
+    @wraps(get)
+    def timed_get(self, key, default=None, version=None):
+        timings = current.get()
+        if timings is None:
+            return get(self, key, default, version)
+        with timed('cache'):
+            value = get(self, key, MISSING, version)
+        if value is MISSING:
+            timings.cache_misses += 1
+            return default
+        timings.cache_hits += 1
+        return value
+
+    @wraps(get_many)
+    def timed_get_many(self, keys, version=None):
+        timings = current.get()
+        if timings is None:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        with timed('cache'):
+            values = get_many(self, keys, version)
+        timings.cache_hits += len(values)
+        timings.cache_misses += len(keys) - len(values)
+        return values
+
+    backend.get, backend.get_many = timed_get, timed_get_many
+    backend._server_timing = True
+
+
+def patch_thumbnails():
+    from sorl.thumbnail.base import ThumbnailBackend
+
+    get_thumbnail = ThumbnailBackend.get_thumbnail
+
+    @wraps(get_thumbnail)
+    def timed_get_thumbnail(self, file_, geometry_string, **options):
+        with timed('thumbnail'):
+            return get_thumbnail(self, file_, geometry_string, **options)
+
+    ThumbnailBackend.get_thumbnail = timed_get_thumbnail
+
+
+_patched = False
+
+
+def install():
+    """Ставит обёртки один раз на процесс."""
+    global _patched
+    if _patched:
+        return
+    patch_template_render()
+    patch_thumbnails()
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend, '_server_timing', False):
+            patch_cache(backend)
+    _patched = True
+
+
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        rate = getattr(settings, 'SERVER_TIMING_SAMPLE_RATE', 0)
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        timings = Timings()
+        token = current.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(time_sql))
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = timings.header(total)
+        logger.info(json.dumps(
+            timings.record(request, response, total), ensure_ascii=False))
+        return response
@@ -0,0 +1,32 @@
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+URL_MAIN = reverse('posts:index')
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_header_and_log(self):
+        """Замеренный запрос отдаёт Server-Timing и пишет строку лога."""
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            response = self.client.get(URL_MAIN)
+        header = response['Server-Timing']
+        for metric in ('sql;', 'template;', 'cache;', 'total;'):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['sql_count'], 1)
+        self.assertGreater(record['cache_misses'], 0)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_not_sampled(self):
+        """Вне выборки запрос не замеряется."""
+        response = self.client.get(URL_MAIN)
+        self.assertFalse(response.has_header('Server-Timing'))
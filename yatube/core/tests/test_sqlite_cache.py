@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import get_context
+
+from django.test import SimpleTestCase
+
+from core.cache_backends.sqlite import SQLiteCache
+
+INCREMENTS = 200
+
+
+def make_cache(directory, **options):
+    return SQLiteCache(
+        os.path.join(directory, 'cache.sqlite3'), {'OPTIONS': options})
+
+
+def increment(directory):
+    cache = make_cache(directory)
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = make_cache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """Запись, чтение, добавление и удаление ключей."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2})
+        self.cache.delete('a')
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired_keys(self):
+        """Просроченный ключ не читается и может быть добавлен заново."""
+        self.cache.set('key', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+
+    def test_shared_between_instances(self):
+        """Два экземпляра видят один файл."""
+        self.cache.set('key', 'value')
+        self.assertEqual(make_cache(self.directory).get('key'), 'value')
+
+    def test_incr_is_atomic_between_processes(self):
+        """incr не теряет обновления из разных процессов."""
+        self.cache.set('counter', 0)
+        context = get_context('spawn')
+        workers = [
+            context.Process(target=increment, args=(self.directory,))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 3 * INCREMENTS)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читанные ключи."""
+        cache = make_cache(self.directory, MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key LIKE '%b'")
+        cache.set('d', 'd')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get_many(['a', 'c', 'd']), {
+            'a': 'a', 'c': 'c', 'd': 'd'})
+
+    def test_size_bound(self):
+        """Объём кэша не превышает MAX_SIZE."""
+        cache = make_cache(self.directory, MAX_SIZE=1000)
+        for i in range(10):
+            cache.set(f'key-{i}', 'x' * 200)
+        size, = cache._connection().execute(
+            'SELECT size FROM cache_stats').fetchone()
+        self.assertLessEqual(size, 1000)
+        self.assertIsNotNone(cache.get('key-9'))
+
+    def test_json_serializer(self):
+        """Сериализатор подключается через OPTIONS."""
+        cache = make_cache(
+            self.directory,
+            SERIALIZER='core.cache_backends.sqlite.JSONSerializer')
+        cache.set('key', [1, 'два'])
+        self.assertEqual(cache.get('key'), [1, 'два'])
@@ -3,7 +3,11 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    # Тесты идут со своими настройками, если не указаны другие.
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE',
+        'yatube.test_settings' if sys.argv[1:2] == ['test']
+        else 'yatube.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
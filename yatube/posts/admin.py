@@ -1,36 +1,164 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db.models import Q
 
-from .models import Post, Group, Comment, Follow
+from . import deletion
+from .group_choices import title_prefix
+from .models import (
+    Post, Group, Comment, DeletionJob, Follow, GroupFollow, User
+)
+from .paginators import EstimatedCountPaginator
+from .search import COMMENT_INDEX, POST_INDEX, search_ids
 
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
+class IndexedSearchMixin:
+    """Поиск в админке через полнотекстовый индекс вместо LIKE."""
+    search_index = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(
+            pk__in=search_ids(self.search_index, search_term)), False
+
+
+class UsernameSearchMixin:
+    """Поиск по точному имени пользователя через уникальный индекс."""
+    username_fields = ()
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        users = User.objects.filter(username=search_term.strip()).values('pk')
+        query = Q()
+        for field in self.username_fields:
+            query |= Q(**{f'{field}__in': users})
+        return queryset.filter(query), False
+
+
+def delete_in_background(kind):
+    """Действие админки: выключить объекты и удалить их по частям."""
+    def action(modeladmin, request, queryset):
+        jobs = [deletion.start(kind, obj) for obj in queryset]
+        deletion.enqueue()
+        modeladmin.message_user(
+            request, f'Запущено удалений: {len(jobs)}. Ход виден в '
+            f'разделе «{DeletionJob._meta.verbose_name_plural}».')
+    action.short_description = 'Удалить по частям в фоне'
+    action.__name__ = 'delete_in_background'
+    return action
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список, который не читает и не считает таблицу целиком.
+
+    Связанные объекты строк приходят одним JOIN из list_select_related,
+    внешние ключи выбираются полем id или подсказками, а не списком всех
+    строк, вместо COUNT(*) — оценка EstimatedCountPaginator.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(IndexedSearchMixin, LargeTableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group', 'views',)
+    list_select_related = ('author', 'group')
+    readonly_fields = ('views',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    list_editable = ('group',)
+    # Группа меняется на странице поста: виджет подсказок в списке
+    # искал бы подпись выбранной группы отдельным запросом на строку.
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    search_index = POST_INDEX
+    actions = (delete_in_background('post'),)
 
 
-class GroupAdmin (admin.ModelAdmin):
+class GroupAdmin (LargeTableAdmin):
     prepopulated_fields = {"slug": ("title",)}
     list_display = ('pk', 'title', 'slug', 'description',)
+    search_fields = ('title',)
+    ordering = ('title',)
+    actions = (delete_in_background('group'),)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск и подсказки для постов — по началу названия.
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(title_prefix(search_term.strip())), False
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, LargeTableAdmin):
     list_display = ('author', 'text', 'created', 'post', )
+    # Строка поста включает его группу и автора.
+    list_select_related = ('author', 'post__author', 'post__group')
     search_fields = ('text',)
     list_filter = ('created',)
+    raw_id_fields = ('author', 'post')
+    date_hierarchy = 'created'
     empty_value_display = '-пусто-'
+    search_index = COMMENT_INDEX
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(UsernameSearchMixin, LargeTableAdmin):
     list_display = ('user', 'author',)
-    search_fields = ('user',)
-    list_filter = ('user',)
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    raw_id_fields = ('user', 'author')
     empty_value_display = '-пусто-'
+    username_fields = ('user', 'author')
+
+
+class GroupFollowAdmin(UsernameSearchMixin, LargeTableAdmin):
+    list_display = ('user', 'group',)
+    list_select_related = ('user', 'group')
+    search_fields = ('user__username',)
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('group',)
+    empty_value_display = '-пусто-'
+    username_fields = ('user',)
+
+
+class UserAdmin(BaseUserAdmin):
+    actions = (delete_in_background('user'),)
+
+
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'name', 'progress', 'created', 'finished',)
+    list_filter = ('kind',)
+    readonly_fields = (
+        'kind', 'object_id', 'name', 'step', 'total', 'done', 'created',
+        'finished',
+    )
+    actions = ('resume',)
+    empty_value_display = '-пусто-'
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, job):
+        if job.finished:
+            return 'удалено'
+        return f'{job.done} из {job.total}'
+    progress.short_description = 'Ход'
+
+    def resume(self, request, queryset):
+        # Задания хранят шаг и прогресс, фоновый поток продолжит их все.
+        deletion.enqueue()
+        self.message_user(request, 'Незаконченные удаления продолжатся.')
+    resume.short_description = 'Продолжить незаконченные'
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(GroupFollow, GroupFollowAdmin)
+admin.site.register(DeletionJob, DeletionJobAdmin)
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
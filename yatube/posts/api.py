@@ -0,0 +1,189 @@
+"""JSON API только для чтения: ленты, пост, комментарии и группы.
+
+Страницы строятся из словарей .values(), без экземпляров моделей, и
+листаются тем же курсором, что и HTML-ленты. Параметр ?fields=id,text
+оставляет в ответе только перечисленные поля.
+"""
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from django.http import JsonResponse
+
+from .caching import conditional_page
+from .group_choices import search_groups
+from .identity import find_group, find_post, find_user
+from .models import Comment, Post
+from .paginators import AFTER, cursor_paginator
+from .settings import (
+    COUNT_COMMENTS_IN_PAGE, COUNT_POSTS_IN_PAGE, GROUP_AUTOCOMPLETE_LIMIT
+)
+from .timeline import FEED_KEY, FEED_PK, get_follow_sources
+from .views import group_scopes, index_scopes, post_scopes, profile_scopes
+
+# Поле ответа: путь в ORM.
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+FIELDS = 'fields'
+# Без экранирования кириллицы и пробелов ответ заметно короче.
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def error(message, status):
+    return json_response({'error': message}, status)
+
+
+def select_fields(request, available):
+    """Поля из ?fields=, по умолчанию все."""
+    value = request.GET.get(FIELDS)
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise FieldsError(
+            'Неизвестные поля: {}.'.format(', '.join(sorted(unknown))))
+    return fields
+
+
+def to_rows(values, fields, available):
+    paths = [available[name] for name in fields]
+    rows = []
+    for value in values:
+        row = dict(zip(fields, (value[path] for path in paths)))
+        if 'image' in row:
+            row['image'] = (
+                default_storage.url(row['image']) if row['image'] else None)
+        rows.append(row)
+    return rows
+
+
+def instance_values(obj, paths):
+    """Словарь путей ORM, как у .values(), для объекта из кэша."""
+    values = {}
+    for path in paths:
+        value = obj
+        for name in path.split('__'):
+            value = None if value is None else getattr(value, name)
+        values[path] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def page_url(request, cursor):
+    params = request.GET.copy()
+    params.pop(AFTER, None)
+    params.pop('before', None)
+    params[AFTER] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def page_response(request, objects, available, per_page, key, pk='pk'):
+    try:
+        fields = select_fields(request, available)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    # pk и ключ курсора нужны пагинатору, даже если их не просили.
+    paths = {available[name] for name in fields} | {pk, key}
+    if isinstance(objects, list):
+        values = [source.values(*paths) for source in objects]
+    else:
+        values = objects.values(*paths)
+    paginator = cursor_paginator(values, per_page, key, pk)
+    paginator.get_page(after=request.GET.get(AFTER))
+    cursor = paginator.next_cursor
+    return json_response({
+        'results': to_rows(paginator.rows, fields, available),
+        'next': cursor and page_url(request, cursor),
+    })
+
+
+def post_page(request, posts):
+    return page_response(
+        request, posts, POST_FIELDS, COUNT_POSTS_IN_PAGE, 'pub_date')
+
+
+@conditional_page(index_scopes)
+def index(request):
+    return post_page(request, Post.objects.visible())
+
+
+@conditional_page(group_scopes)
+def group_posts(request, slug):
+    group = find_group(slug)
+    if group is None:
+        return error('Группа не найдена.', 404)
+    return post_page(
+        request, Post.objects.visible().filter(group_id=group.pk))
+
+
+@conditional_page(profile_scopes)
+def profile(request, username):
+    author = find_user(username)
+    if author is None:
+        return error('Автор не найден.', 404)
+    return post_page(
+        request, Post.objects.visible().filter(author_id=author.pk))
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Нужна авторизация.', 401)
+    return page_response(
+        request, get_follow_sources(request.user), POST_FIELDS,
+        COUNT_POSTS_IN_PAGE, FEED_KEY, FEED_PK)
+
+
+@conditional_page(post_scopes)
+def post_detail(request, post_id):
+    try:
+        fields = select_fields(request, POST_FIELDS)
+    except FieldsError as exc:
+        return error(str(exc), 400)
+    post = find_post(post_id)
+    if post is None:
+        return error('Пост не найден.', 404)
+    values = instance_values(post, [POST_FIELDS[name] for name in fields])
+    return json_response(to_rows([values], fields, POST_FIELDS)[0])
+
+
+@conditional_page(post_scopes)
+def post_comments(request, post_id):
+    if find_post(post_id) is None:
+        return error('Пост не найден.', 404)
+    return page_response(
+        request, Comment.objects.filter(post_id=post_id).visible(),
+        COMMENT_FIELDS, COUNT_COMMENTS_IN_PAGE, 'created')
+
+
+def groups_scopes(request):
+    # Поколение ('groups',) и так входит в каждую страницу.
+    return []
+
+
+@conditional_page(groups_scopes)
+def group_autocomplete(request):
+    """Группы для подсказок формы поста по началу названия из ?q=."""
+    prefix = request.GET.get('q', '').strip()
+    groups = search_groups(prefix, GROUP_AUTOCOMPLETE_LIMIT) if prefix else []
+    return json_response({
+        'results': [{'id': pk, 'title': title} for pk, title in groups],
+    })
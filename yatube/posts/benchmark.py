@@ -0,0 +1,136 @@
+"""Замеры публичных страниц: задержка, число запросов, пик памяти.
+
+Каждая страница запрашивается тестовым клиентом Django целиком, через
+middleware и шаблоны. Отчёт — JSON с отсортированными ключами, чтобы
+отчёты двух прогонов сравнивались обычным diff.
+"""
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Follow, Group, Post, User
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def pick_targets():
+    """Самые нагруженные объекты: их страницы дороже всего."""
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total').first()
+    author = Follow.objects.values('author').annotate(
+        total=Count('pk')).order_by('-total').values_list(
+            'author', flat=True).first()
+    reader = Follow.objects.values('user').annotate(
+        total=Count('pk')).order_by('-total').values_list(
+            'user', flat=True).first()
+    post = Comment.objects.values('post').annotate(
+        total=Count('pk')).order_by('-total').values_list(
+            'post', flat=True).first()
+    return {
+        'group': group,
+        'author': User.objects.filter(
+            pk=author).first() or User.objects.first(),
+        'reader': User.objects.filter(pk=reader).first(),
+        'post': post or Post.objects.values_list('pk', flat=True).first(),
+    }
+
+
+def views(targets):
+    """(название, адрес, пользователь) страниц для замера."""
+    pages = [
+        ('index', reverse('posts:index'), None),
+        ('index_page_2', reverse('posts:index') + '?page=2', None),
+        ('trending', reverse('posts:trending'), None),
+        ('search', reverse('posts:search') + '?q=дом', None),
+        ('api_index', reverse('api:index'), None),
+    ]
+    if targets['group']:
+        pages.append((
+            'group_posts',
+            reverse('posts:group_list', args=[targets['group'].slug]), None))
+    if targets['author']:
+        pages.append((
+            'profile',
+            reverse('posts:profile', args=[targets['author'].username]),
+            None))
+    if targets['post']:
+        pages.append((
+            'post_detail',
+            reverse('posts:post_detail', args=[targets['post']]), None))
+        pages.append((
+            'api_post_comments',
+            reverse('api:post_comments', args=[targets['post']]), None))
+    if targets['reader']:
+        pages.append((
+            'follow_index', reverse('posts:follow_index'),
+            targets['reader']))
+    return pages
+
+
+def measure(client, url, iterations, cold):
+    latencies = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        start = time.perf_counter()
+        response = client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    if cold:
+        cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        client.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    result = {
+        'status': response.status_code,
+        'queries': len(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'mean_ms': round(statistics.mean(latencies), 3),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(
+            percentile(latencies, percent), 3)
+    return result
+
+
+def run(iterations, cold=False):
+    """Меряет все страницы, возвращает отчёт для json.dump."""
+    targets = pick_targets()
+    report = {
+        'meta': {
+            'iterations': iterations,
+            'cold_cache': cold,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'rows': {
+                model._meta.model_name: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+        },
+        'views': {},
+    }
+    for name, url, user in views(targets):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        # Первый запрос прогревает шаблоны и соединение, в замер не идёт.
+        client.get(url)
+        report['views'][name] = {
+            'url': url, **measure(client, url, iterations, cold)}
+    return report
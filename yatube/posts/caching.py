@@ -0,0 +1,96 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, quote_etag
+)
+from django.utils.http import http_date
+
+GENERATION_KEY = 'posts:generation:{}'
+FEED_PARAMS = ('page', 'after', 'before')
+# Названия групп и имена авторов видны в любой ленте.
+SHARED_SCOPES = (('groups',), ('authors',))
+
+
+def generation_key(scope):
+    return GENERATION_KEY.format(':'.join(map(str, scope)))
+
+
+def new_generation():
+    # Время выпуска поколения служит Last-Modified страниц, которые от
+    # него зависят; случайная часть делает значение уникальным.
+    return f'{time.time():.6f}-{uuid.uuid4().hex}'
+
+
+def generation_time(generation):
+    try:
+        return float(generation.split('-')[0])
+    except ValueError:
+        return None
+
+
+def get_generations(*scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = {key: new_generation() for key in keys if key not in generations}
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(*scopes):
+    # Новое случайное значение, а не incr: после вытеснения ключа из кэша
+    # поколение не может совпасть с уже использованным.
+    cache.set_many(
+        {generation_key(scope): new_generation() for scope in scopes}, None)
+
+
+def feed_cache_key(request, *scope):
+    return ':'.join(
+        get_generations(scope, *SHARED_SCOPES)
+        + [request.GET.get(param, '') for param in FEED_PARAMS]
+    )
+
+
+def conditional_page(get_scopes):
+    """Отвечает 304 Not Modified, пока не сменились поколения страницы.
+
+    get_scopes(request, *args, **kwargs) возвращает области, от которых
+    зависит страница, или None, если проверять нечего (например, объекта
+    нет и view ответит 404). ETag собирается из поколений, пользователя и
+    адреса запроса, Last-Modified — время самого нового поколения.
+    Запросы страницы и шаблон при совпадении не выполняются.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            scopes = get_scopes(request, *args, **kwargs)
+            if scopes is None:
+                return view(request, *args, **kwargs)
+            generations = get_generations(*scopes, *SHARED_SCOPES)
+            etag = quote_etag(hashlib.md5(':'.join([
+                str(request.user.pk), request.get_full_path(),
+                *generations,
+            ]).encode()).hexdigest())
+            times = [generation_time(value) for value in generations]
+            last_modified = None if None in times else int(max(times))
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+                # Страница зависит от пользователя и должна
+                # перепроверяться при каждом показе.
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
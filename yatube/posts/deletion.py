@@ -0,0 +1,161 @@
+"""Удаление пользователей, постов и групп по частям в фоне.
+
+delete() собирает все зависимые строки в память и стирает их одной
+транзакцией, и на всё это время SQLite заперта для записи. Здесь объект
+сначала выключается: start() заводит DeletionJob, после чего поиск
+автора, группы или поста его не находит, а пользователь не может войти.
+Затем run() проходит шаги вида объекта и удаляет зависимые строки
+пачками по DELETION_BATCH_SIZE. Каждая пачка идёт в своей короткой
+транзакции вместе с отметкой прогресса, поэтому прерванное задание
+продолжается с того же места. Удаление идёт через delete() пачки,
+так что сигналы счётчиков, лент и поиска срабатывают как обычно.
+Последним удаляется сам объект, у которого зависимых уже не осталось.
+
+Задания выполняет фоновый поток после коммита или команда
+run_deletions, если процесс с потоком остановился.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import identity
+from .caching import bump_generations
+from .models import (
+    Comment, DeletionJob, Follow, Group, GroupFollow, Post, TimelineEntry,
+    User
+)
+from .settings import DELETION_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def _delete(ids, model):
+    model.objects.filter(pk__in=ids).delete()
+
+
+def _detach(ids, model):
+    # Посты группы остаются, у них только пропадает группа. update()
+    # сигналов не шлёт, поэтому кэш постов сбрасываем сами.
+    Post.objects.filter(pk__in=ids).update(group=None)
+    identity.forget('post', *ids)
+
+
+# Вид объекта: модель и шаги (действие, строки по id объекта).
+KINDS = {
+    'user': (User, (
+        (_delete, lambda pk: TimelineEntry.objects.filter(
+            Q(user_id=pk) | Q(author_id=pk))),
+        (_delete, lambda pk: Comment.objects.filter(
+            Q(author_id=pk) | Q(post__author_id=pk))),
+        (_delete, lambda pk: Follow.objects.filter(
+            Q(user_id=pk) | Q(author_id=pk))),
+        (_delete, lambda pk: GroupFollow.objects.filter(user_id=pk)),
+        (_delete, lambda pk: Post.objects.filter(author_id=pk)),
+    )),
+    'post': (Post, (
+        (_delete, lambda pk: TimelineEntry.objects.filter(post_id=pk)),
+        (_delete, lambda pk: Comment.objects.filter(post_id=pk)),
+    )),
+    'group': (Group, (
+        (_delete, lambda pk: GroupFollow.objects.filter(group_id=pk)),
+        (_detach, lambda pk: Post.objects.filter(group_id=pk)),
+    )),
+}
+
+
+def disable(kind, obj):
+    """Прячет объект до того, как удалятся его зависимые строки.
+
+    Ленты, поиск и API не показывают удаляемые посты и посты удаляемых
+    авторов (PostQuerySet.visible), а смена поколений после коммита
+    сбрасывает уже закэшированные страницы с ними.
+    """
+    field = identity.LOOKUPS[kind][1]
+    identity.forget(kind, getattr(obj, field))
+    if kind == 'user':
+        User.objects.filter(pk=obj.pk).update(is_active=False)
+        identity.forget_author_posts(obj.pk)
+        # Имя автора входит в каждую ленту, вместе с ним меняются все.
+        scopes = [('authors',), ('trending',), ('profile', obj.pk)]
+    elif kind == 'post':
+        scopes = [
+            ('index',), ('trending',), ('profile', obj.author_id),
+            ('post', obj.pk),
+        ]
+        if obj.group_id:
+            scopes.append(('group', obj.group_id))
+    else:
+        # Группа пропадает из выбора в форме поста и из всех лент.
+        scopes = [('groups',), ('group', obj.pk)]
+    transaction.on_commit(lambda: bump_generations(*scopes))
+
+
+def start(kind, obj):
+    """Выключает объект и заводит задание на его удаление."""
+    steps = KINDS[kind][1]
+    with transaction.atomic():
+        job, created = DeletionJob.objects.get_or_create(
+            kind=kind, object_id=obj.pk, defaults={
+                'name': str(getattr(obj, identity.LOOKUPS[kind][1])),
+                'total': sum(rows(obj.pk).count() for _, rows in steps),
+            })
+        if created:
+            disable(kind, obj)
+    return job
+
+
+def run(job, batch_size=DELETION_BATCH_SIZE):
+    """Продолжает задание с его шага, после каждой пачки отдаёт job.done."""
+    model, steps = KINDS[job.kind]
+    while job.step < len(steps):
+        action, rows = steps[job.step]
+        with transaction.atomic():
+            ids = list(rows(job.object_id).order_by().values_list(
+                'pk', flat=True)[:batch_size])
+            if ids:
+                action(ids, rows(job.object_id).model)
+                job.done += len(ids)
+            else:
+                job.step += 1
+            job.save(update_fields=['step', 'done'])
+        if ids:
+            yield job.done
+    with transaction.atomic():
+        model.objects.filter(pk=job.object_id).delete()
+        job.finished = timezone.now()
+        job.save(update_fields=['finished'])
+
+
+def run_pending(batch_size=DELETION_BATCH_SIZE):
+    """Доводит до конца все незаконченные задания, старые первыми."""
+    jobs = DeletionJob.objects.filter(finished__isnull=True).order_by('pk')
+    for job in jobs:
+        for _ in run(job, batch_size):
+            pass
+
+
+def _work():
+    try:
+        run_pending()
+    except DatabaseError:
+        # Задание продолжит следующий запуск или команда run_deletions.
+        logger.exception('Не удалось закончить удаление')
+    finally:
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Один поток: задания не мешают друг другу и не держат SQLite
+        # сразу из нескольких транзакций.
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def enqueue():
+    transaction.on_commit(lambda: get_executor().submit(_work))
@@ -0,0 +1,105 @@
+"""Граф подписок в кэше: отсортированные массивы id.
+
+Для каждого читателя хранится массив id авторов, на которых он подписан,
+для каждого автора — массив id подписчиков. Проверка подписки — бинарный
+поиск, число подписчиков — длина массива, к таблице Follow обращаются
+только при построении массива после промаха.
+
+В кэш попадает только закоммиченное: массив, собранный внутри
+транзакции, не сохраняется (она может откатиться), а подписка и отписка
+после коммита удаляют массивы обоих участников, и следующее чтение
+строит их заново. Правка на месте теряла бы изменения двух подписок
+сразу. Чтение, начатое до коммита, может успеть положить старый массив
+после удаления, поэтому массив живёт не дольше FOLLOW_GRAPH_TIMEOUT.
+Кэш переживает migrate и flush, поэтому ключи включают поколение
+GRAPH_SCOPE, и reset() его меняет.
+"""
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .caching import bump_generations, get_generations
+from .models import Follow
+from .settings import FOLLOW_GRAPH_TIMEOUT
+
+GRAPH_SCOPE = ('follow_graph',)
+GRAPH_KEY = 'follow_graph:{kind}:{generation}:{pk}'
+# Вид массива: поле, по которому он собран, и поле значений.
+KINDS = {
+    'following': ('user', 'author'),
+    'followers': ('author', 'user'),
+}
+
+
+def _key(kind, generation, pk):
+    return GRAPH_KEY.format(kind=kind, generation=generation, pk=pk)
+
+
+def _build(kind, ids):
+    field, value = KINDS[kind]
+    edges = defaultdict(lambda: array('q'))
+    rows = Follow.objects.filter(**{f'{field}__in': ids}).order_by(
+        value).values_list(field, value)
+    for pk, other in rows.iterator():
+        edges[pk].append(other)
+    return {pk: edges[pk] for pk in ids}
+
+
+def get_many(kind, ids):
+    """Массивы вида kind для нескольких id; промахи строит один запрос."""
+    generation, = get_generations(GRAPH_SCOPE)
+    keys = {pk: _key(kind, generation, pk) for pk in set(ids)}
+    cached = cache.get_many(list(keys.values()))
+    graph = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+    missing = [pk for pk in keys if pk not in graph]
+    if missing:
+        built = _build(kind, missing)
+        if not connection.in_atomic_block:
+            cache.set_many(
+                {keys[pk]: built[pk] for pk in missing},
+                FOLLOW_GRAPH_TIMEOUT)
+        graph.update(built)
+    return graph
+
+
+def get_following(user_id):
+    return get_many('following', [user_id])[user_id]
+
+
+def get_followers(author_id):
+    return get_many('followers', [author_id])[author_id]
+
+
+def contains(ids, pk):
+    index = bisect_left(ids, pk)
+    return index < len(ids) and ids[index] == pk
+
+
+def is_following(user_id, author_id):
+    return contains(get_following(user_id), author_id)
+
+
+def forget(follows):
+    """Сбрасывает массивы участников подписок после коммита."""
+    pairs = [(follow.user_id, follow.author_id) for follow in follows]
+
+    def delete():
+        generation, = get_generations(GRAPH_SCOPE)
+        cache.delete_many([
+            key
+            for user_id, author_id in pairs
+            for key in (
+                _key('following', generation, user_id),
+                _key('followers', generation, author_id),
+            )
+        ])
+    transaction.on_commit(delete)
+
+
+def reset():
+    bump_generations(GRAPH_SCOPE)
@@ -1,7 +1,9 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 
+from .group_choices import CachedGroupChoices, GroupAutocomplete
 from .models import Comment, Post
+from .settings import GROUP_SELECT_AUTOCOMPLETE
 
 
 class PostForm(forms.ModelForm):
@@ -19,6 +21,18 @@ class PostForm(forms.ModelForm):
             'image': _('Добавить изображение'),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Поле остаётся ModelChoiceField и проверяет id по базе, меняется
+        # только то, откуда берутся варианты для показа.
+        group = self.fields['group']
+        if GROUP_SELECT_AUTOCOMPLETE:
+            group.widget = GroupAutocomplete()
+            group.widget.is_required = group.required
+        else:
+            group.iterator = CachedGroupChoices
+            group.widget.choices = group.choices
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
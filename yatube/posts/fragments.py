@@ -0,0 +1,89 @@
+"""Кэш готового HTML постов в лентах.
+
+Ключ фрагмента собран из всего, что видно в posts/includes/post.html:
+даты правки поста, картинки, имён автора и названия группы. Правка поста
+меняет edited, переименование автора или группы — сами имена, поэтому
+устаревший фрагмент просто перестаёт находиться и вытесняется из кэша.
+Страница читает фрагменты одним get_many и рендерит только промахи.
+
+Ключ включает и готовность версий картинки. Пост, чьи версии ещё не
+посчитаны, показан запасной картинкой: такой фрагмент хранится под
+своим ключом только POST_HTML_FALLBACK_TIMEOUT, после чего пост
+рендерится заново и с готовыми версиями сохраняется на обычный срок.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.middleware.server_timing import timed
+
+from .images import get_picture, prefetch_variants
+from .settings import POST_HTML_FALLBACK_TIMEOUT, POST_HTML_TIMEOUT
+from .thumbnails import resolve_thumbnails
+
+POST_TEMPLATE = 'posts/includes/post.html'
+POST_HTML_KEY = 'post_html:{kind}:{hide_group:d}:{ready:d}:{pk}:{digest}'
+
+
+def post_html_key(post, kind, hide_group, ready=True):
+    author, group = post.author, post.group
+    parts = [
+        post.edited.isoformat(), post.image.name,
+        author.username, author.first_name, author.last_name,
+    ]
+    if group is not None:
+        parts += [str(group.pk), group.slug, group.title]
+    digest = hashlib.md5('\0'.join(parts).encode()).hexdigest()
+    return POST_HTML_KEY.format(
+        kind=kind, hide_group=hide_group, ready=ready, pk=post.pk,
+        digest=digest)
+
+
+def post_html_keys(post, kind, hide_group):
+    """Ключи фрагмента: сначала с готовыми версиями картинки."""
+    if not post.image:
+        return [post_html_key(post, kind, hide_group)]
+    return [
+        post_html_key(post, kind, hide_group, ready)
+        for ready in (True, False)
+    ]
+
+
+def is_final(post, kind):
+    return not post.image or bool(get_picture(post, kind))
+
+
+def render_posts(posts, kind='feed', hide_group=False):
+    """HTML постов в порядке posts: из кэша или отрендеренный заново."""
+    posts = list(posts)
+    keys = {
+        post.pk: post_html_keys(post, kind, hide_group) for post in posts
+    }
+    cached = cache.get_many([key for pk in keys for key in keys[pk]])
+    fragments = {}
+    for post in posts:
+        for key in keys[post.pk]:
+            if key in cached:
+                fragments[post.pk] = cached[key]
+                break
+    missing = [post for post in posts if post.pk not in fragments]
+    if missing:
+        with timed('thumbnail'):
+            resolve_thumbnails(missing, kind)
+            prefetch_variants(missing)
+        template = get_template(POST_TEMPLATE)
+        final, fallback = {}, {}
+        for post in missing:
+            html = template.render({'post': post, 'hide_group': hide_group})
+            fragments[post.pk] = html
+            if is_final(post, kind):
+                final[keys[post.pk][0]] = html
+            else:
+                fallback[keys[post.pk][1]] = html
+        if final:
+            cache.set_many(final, POST_HTML_TIMEOUT)
+        if fallback:
+            cache.set_many(fallback, POST_HTML_FALLBACK_TIMEOUT)
+    return [mark_safe(fragments[post.pk]) for post in posts]
@@ -0,0 +1,94 @@
+"""Выбор группы в форме поста.
+
+Пока групп немного, список вариантов берётся из кэша: ключ включает
+поколение ('groups',), которое меняется при любом изменении группы,
+так что страница создания поста не читает таблицу групп. Когда групп
+слишком много для <select>, настройка GROUP_SELECT_AUTOCOMPLETE
+включает поле с подсказками: браузер запрашивает группы по началу
+названия, а в форму попадает только id выбранной.
+
+Как и другие кэши, список сохраняется только вне транзакции.
+"""
+from django import forms
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.forms.models import ModelChoiceIterator
+from django.urls import reverse
+
+from .caching import bump_generations, get_generations
+from .models import DeletionJob, Group
+from .settings import GROUP_CHOICES_TIMEOUT
+
+GROUP_CHOICES_KEY = 'group_choices:{generation}'
+# Верхняя граница для диапазона по префиксу: больше любого символа.
+PREFIX_END = '\U0010ffff'
+
+
+def get_group_choices():
+    """Пары (id, название) всех групп, отсортированные по названию."""
+    generation, = get_generations(('groups',))
+    key = GROUP_CHOICES_KEY.format(generation=generation)
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(Group.objects.exclude(
+            pk__in=DeletionJob.objects.object_ids('group')).order_by(
+                'title').values_list('pk', 'title'))
+        if not connection.in_atomic_block:
+            cache.set(key, choices, GROUP_CHOICES_TIMEOUT)
+    return choices
+
+
+def reset():
+    bump_generations(('groups',))
+
+
+class CachedGroupChoices(ModelChoiceIterator):
+    """Варианты ModelChoiceField из кэша вместо запроса к queryset."""
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from get_group_choices()
+
+    def __len__(self):
+        return (
+            len(get_group_choices()) + (self.field.empty_label is not None)
+        )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(
+            get_group_choices())
+
+
+def title_prefix(prefix):
+    """Условие «название начинается с prefix».
+
+    LIKE в SQLite не различает регистр и не использует обычный индекс,
+    поэтому ищем диапазоном по индексу title: как набрано и с заглавной
+    буквы.
+    """
+    query = Q()
+    for variant in {prefix, prefix[:1].upper() + prefix[1:]}:
+        query |= Q(title__gte=variant, title__lt=variant + PREFIX_END)
+    return query
+
+
+def search_groups(prefix, limit):
+    return Group.objects.filter(title_prefix(prefix)).exclude(
+        pk__in=DeletionJob.objects.object_ids('group')).order_by(
+            'title').values_list('pk', 'title')[:limit]
+
+
+class GroupAutocomplete(forms.Widget):
+    """Поле ввода названия с подсказками и скрытым id группы."""
+    template_name = 'posts/widgets/group_autocomplete.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        value = context['widget']['value']
+        # После ошибки в форме здесь может оказаться что угодно.
+        context['widget']['title'] = value and value.isdigit() and (
+            Group.objects.filter(pk=value).values_list(
+                'title', flat=True).first())
+        context['widget']['url'] = reverse('api:group_autocomplete')
+        return context
@@ -0,0 +1,134 @@
+"""Кэш поиска автора по имени, группы по slug и поста по id.
+
+Страницы профиля, группы и поста начинаются с одного и того же запроса,
+поэтому найденный объект кладётся в кэш на IDENTITY_TIMEOUT, а
+отсутствующий — отдельной записью на IDENTITY_MISSING_TIMEOUT, чтобы
+запросы к несуществующим адресам тоже не ходили в базу. Сохранение и
+удаление объекта удаляет его записи сигналами, переименование автора или
+группы — ещё и записи их постов, пачками по IDENTITY_FORGET_BATCH_SIZE.
+
+Промах, прочитавший объект до чужого коммита, может сохранить его уже
+после удаления записи. Посты правятся чаще всего, поэтому их записи
+живут IDENTITY_POST_TIMEOUT: столько в худшем случае виден старый пост.
+
+Как и граф подписок, кэш хранит только закоммиченное: найденное внутри
+транзакции не сохраняется, а ключ входит в поколение IDENTITY_SCOPE,
+которое меняется после migrate и flush. Попадания и промахи считаются в
+логе Server-Timing.
+"""
+import hashlib
+from array import array
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import Http404
+
+from core.middleware.server_timing import count
+
+from .caching import bump_generations, generation_key, get_generations
+from .models import DeletionJob, Group, Post, User
+from .settings import (
+    IDENTITY_FORGET_BATCH_SIZE, IDENTITY_MISSING_TIMEOUT,
+    IDENTITY_POST_TIMEOUT, IDENTITY_TIMEOUT
+)
+
+IDENTITY_SCOPE = ('identity',)
+IDENTITY_KEY = 'identity:{kind}:{digest}'
+# Вид записи: выборка и поле, по которому ищем. Хэш пароля и прочие
+# поля пользователя в кэш не попадают.
+LOOKUPS = {
+    'user': (
+        lambda: User.objects.only('username', 'first_name', 'last_name'),
+        'username',
+    ),
+    'group': (lambda: Group.objects.all(), 'slug'),
+    # Пост удаляемого автора тоже не находится: for_detail() видимые.
+    'post': (lambda: Post.objects.for_detail(), 'pk'),
+}
+TIMEOUTS = {'post': IDENTITY_POST_TIMEOUT}
+
+
+def _key(kind, value):
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return IDENTITY_KEY.format(kind=kind, digest=digest)
+
+
+def find(kind, value):
+    """Объект вида kind по значению поля или None, если его нет."""
+    key = _key(kind, value)
+    scope_key = generation_key(IDENTITY_SCOPE)
+    cached = cache.get_many([scope_key, key])
+    generation = cached.get(scope_key)
+    entry = cached.get(key)
+    if generation is not None and entry is not None and (
+            entry[0] == generation):
+        count('identity_hits')
+        return entry[1]
+    count('identity_misses')
+    if generation is None:
+        generation, = get_generations(IDENTITY_SCOPE)
+    objects, field = LOOKUPS[kind]
+    # Объекты, которые удаляются по частям, уже не находятся.
+    found = objects().filter(**{field: value}).exclude(
+        pk__in=DeletionJob.objects.object_ids(kind)).first()
+    if not connection.in_atomic_block:
+        cache.set(
+            key, (generation, found),
+            TIMEOUTS.get(kind, IDENTITY_TIMEOUT) if found
+            else IDENTITY_MISSING_TIMEOUT)
+    return found
+
+
+def find_user(username):
+    return find('user', username)
+
+
+def find_group(slug):
+    return find('group', slug)
+
+
+def find_post(post_id):
+    return find('post', post_id)
+
+
+def get_or_404(kind, value):
+    found = find(kind, value)
+    if found is None:
+        raise Http404(f'Не найден объект {kind}: {value}')
+    return found
+
+
+def _forget(kind, values):
+    def delete():
+        # Один delete_many на все ключи упёрся бы в предел числа
+        # переменных запроса SQLite.
+        for start in range(0, len(values), IDENTITY_FORGET_BATCH_SIZE):
+            cache.delete_many([
+                _key(kind, value)
+                for value in values[start:start + IDENTITY_FORGET_BATCH_SIZE]
+            ])
+    transaction.on_commit(delete)
+
+
+def forget(kind, *values):
+    """Удаляет записи после коммита: до него их снова прочли бы старыми."""
+    _forget(kind, values)
+
+
+def _forget_posts(posts):
+    # id читаем сейчас: после коммита посты удалённой группы её уже не
+    # имеют. Массив чисел, а не список ключей, держит память маленькой.
+    _forget('post', array('q', posts.order_by().values_list(
+        'pk', flat=True).iterator()))
+
+
+def forget_author_posts(author_id):
+    _forget_posts(Post.objects.filter(author_id=author_id))
+
+
+def forget_group_posts(group_id):
+    _forget_posts(Post.objects.filter(group_id=group_id))
+
+
+def reset():
+    bump_generations(IDENTITY_SCOPE)
@@ -0,0 +1,144 @@
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models import Exists, OuterRef, prefetch_related_objects
+from PIL import Image, ImageOps
+
+from .caching import bump_generations
+from .models import ImageVariant, Post
+from .settings import (
+    IMAGE_VARIANT_FORMATS, IMAGE_VARIANT_QUALITY, IMAGE_VARIANTS
+)
+
+logger = logging.getLogger(__name__)
+
+
+def available_formats():
+    Image.init()
+    return [
+        (image_format, extension, mime_type)
+        for image_format, extension, mime_type in IMAGE_VARIANT_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format, quality=IMAGE_VARIANT_QUALITY, optimize=True)
+    return ContentFile(buffer.getvalue())
+
+
+def _render(source, kind, formats):
+    box_width, box_height = IMAGE_VARIANTS[kind]['box']
+    widths = [
+        width for width in IMAGE_VARIANTS[kind]['widths']
+        if width <= source.width
+    ] or [source.width]
+    for width in widths:
+        height = max(round(width * box_height / box_width), 1)
+        image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+        for image_format, extension, mime_type in formats:
+            yield width, extension, mime_type, _encode(image, image_format)
+
+
+def generate_variants(post_pk):
+    """Считает версии картинки поста, если их ещё нет для этого файла."""
+    post = Post.objects.filter(pk=post_pk).only('image').first()
+    if post is None or not post.image:
+        return
+    variants = ImageVariant.objects.filter(post=post)
+    if variants.filter(source=post.image.name).exists():
+        return
+    for variant in variants:
+        variant.image.delete(save=False)
+    variants.delete()
+    with post.image.open() as file:
+        source = Image.open(file)
+        source = ImageOps.exif_transpose(source).convert('RGB')
+    formats = available_formats()
+    records = []
+    for kind in IMAGE_VARIANTS:
+        for width, extension, mime_type, content in _render(
+                source, kind, formats):
+            variant = ImageVariant(
+                post=post, source=post.image.name, kind=kind, width=width,
+                mime_type=mime_type)
+            variant.image.save(
+                f'{post.pk}/{kind}-{width}.{extension}', content, save=False)
+            records.append(variant)
+    ImageVariant.objects.bulk_create(records)
+
+
+def generate_missing_variants(batch_size):
+    """Считает версии картинок, загруженных до их появления, по пачкам.
+
+    После каждой пачки отдаёт число обработанных постов и меняет
+    поколения их лент, чтобы страницы показали версии.
+    """
+    ready = ImageVariant.objects.filter(
+        post=OuterRef('pk'), source=OuterRef('image'))
+    posts = Post.objects.exclude(image='').annotate(
+        ready=Exists(ready)).filter(ready=False).order_by('pk')
+    last = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last).values_list(
+            'pk', 'author', 'group')[:batch_size])
+        if not batch:
+            return
+        scopes = {('index',), ('trending',)}
+        for pk, author_id, group_id in batch:
+            try:
+                generate_variants(pk)
+            except OSError:
+                # Битый или пропавший файл не должен останавливать проход.
+                logger.exception('Не удалось посчитать версии поста %s', pk)
+                continue
+            scopes |= {('profile', author_id), ('post', pk)}
+            if group_id:
+                scopes.add(('group', group_id))
+        bump_generations(*scopes)
+        last = batch[-1][0]
+        yield len(batch)
+
+
+class Picture:
+    """Данные для <picture>: источники по форматам и запасной <img>."""
+    def __init__(self, variants, sizes):
+        by_type = {}
+        for variant in variants:
+            by_type.setdefault(variant.mime_type, []).append(variant)
+        *modern, (_, _, fallback_type) = IMAGE_VARIANT_FORMATS
+        fallback = by_type.get(fallback_type, [])
+        self.sizes = sizes
+        self.sources = [
+            {'type': mime_type, 'srcset': self._srcset(by_type[mime_type])}
+            for _, _, mime_type in modern if mime_type in by_type
+        ]
+        self.srcset = self._srcset(fallback)
+        self.src = fallback[-1].image.url if fallback else None
+
+    @staticmethod
+    def _srcset(variants):
+        return ', '.join(
+            f'{variant.image.url} {variant.width}w' for variant in variants)
+
+    def __bool__(self):
+        return self.src is not None
+
+
+def prefetch_variants(posts):
+    """Читает версии картинок всех постов страницы одним запросом."""
+    prefetch_related_objects(
+        [post for post in posts if post.image], 'image_variants')
+
+
+def get_picture(post, kind):
+    if not post.image:
+        return None
+    variants = [
+        variant for variant in post.image_variants.all()
+        if variant.kind == kind and variant.source == post.image.name
+    ]
+    return Picture(variants, IMAGE_VARIANTS[kind]['sizes'])
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import run
+
+
+class Command(BaseCommand):
+    help = (
+        'Меряет задержку, запросы и память публичных страниц и пишет '
+        'отчёт JSON. Запускать на отдельной базе после seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом (сбрасывает весь кэш!).')
+
+    def handle(self, *args, **options):
+        report = run(options['iterations'], options['cold'])
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
+        for name, result in sorted(report['views'].items()):
+            self.stdout.write(
+                f'{name:<18} p50 {result["p50_ms"]:>8.2f} мс'
+                f'  p99 {result["p99_ms"]:>8.2f} мс'
+                f'  запросов {result["queries"]:>3}'
+                f'  память {result["peak_memory_kb"]:>8.1f} КБ')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт: {options["output"]}'))
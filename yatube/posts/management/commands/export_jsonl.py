@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.settings import TRANSFER_BATCH_SIZE
+from posts.transfer import EXPORTS, export, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .jsonl.gz.')
+        parser.add_argument(
+            '--models', nargs='+', choices=list(EXPORTS),
+            default=list(EXPORTS))
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        # Порядок файла всегда как в EXPORTS: ссылки идут после объектов.
+        names = [name for name in EXPORTS if name in options['models']]
+        with open_stream(options['path'], 'w') as stream:
+            counts = export(stream, names, options['batch_size'])
+        for name in names:
+            self.stdout.write(f'{name}: {counts[name]}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import generate_missing_variants
+from posts.settings import IMAGE_VARIANT_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Считает версии картинок постов, у которых их ещё нет.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=IMAGE_VARIANT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        for done in generate_missing_variants(options['batch_size']):
+            total += done
+            self.stdout.write(f'Обработано постов: {total}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.settings import TRANSFER_BATCH_SIZE
+from posts.transfer import Importer, open_stream
+
+
+class Command(BaseCommand):
+    help = 'Загружает группы, посты, комментарии и подписки из JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .jsonl.gz.')
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE)
+        parser.add_argument(
+            '--media-from',
+            help='Каталог, откуда брать картинки, которых нет в MEDIA_ROOT.')
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'], options['media_from'])
+        try:
+            with open_stream(options['path'], 'r') as stream:
+                counts = importer.run(stream)
+        except (KeyError, ValueError) as error:
+            raise CommandError(f'Файл не загружен: {error!r}')
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
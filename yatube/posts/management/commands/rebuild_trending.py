@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.settings import TRENDING_BATCH_SIZE
+from posts.trending import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярной ленты с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=TRENDING_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        for done in rebuild_all(options['batch_size']):
+            total += done
+            self.stdout.write(f'Пересчитано постов: {total}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
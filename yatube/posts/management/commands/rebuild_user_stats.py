@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики пользователей с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        for done in rebuild_all(options['batch_size']):
+            total += done
+            self.stdout.write(f'Пересчитано пользователей: {total}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
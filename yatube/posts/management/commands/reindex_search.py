@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import INDEXES, reindex
+from posts.settings import SEARCH_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=SEARCH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        for model in INDEXES:
+            total = 0
+            for done in reindex(model, options['batch_size']):
+                total += done
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}: {total}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
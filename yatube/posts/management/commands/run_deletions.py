@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.deletion import run
+from posts.models import DeletionJob
+from posts.settings import DELETION_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Доводит до конца удаления, прерванные вместе с процессом.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=DELETION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.filter(
+            finished__isnull=True).order_by('pk')
+        for job in jobs:
+            for done in run(job, options['batch_size']):
+                self.stdout.write(f'{job}: {done} из {job.total}')
+            self.stdout.write(f'{job}: удалено')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.seeding import seed
+from posts.settings import TRANSFER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу детерминированными данными для замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=TRANSFER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        counts = seed(
+            options['batch_size'],
+            users=max(options['users'], 1), groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], seed=options['seed'])
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS('Готово.'))
@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+# Значения posts.settings на момент миграции: авторов с таким числом
+# подписчиков лента читает напрямую, остальным раскладываем только
+# последние посты.
+FANOUT_LIMIT = 1000
+BACKFILL_POSTS = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    authors = Follow.objects.values('author').annotate(
+        followers=Count('id')).filter(
+            followers__lt=FANOUT_LIMIT).values_list('author', flat=True)
+    for author_id in list(authors):
+        post_ids = list(Post.objects.filter(author_id=author_id).order_by(
+            '-pub_date').values_list('pk', flat=True)[:BACKFILL_POSTS])
+        user_ids = list(Follow.objects.filter(
+            author_id=author_id).values_list('user', flat=True))
+        for user_id in user_ids:
+            TimelineEntry.objects.bulk_create(
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                )
+                for post_id in post_ids
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0016_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Читатель')),
+            ],
+            options={
+                'verbose_name': 'запись ленты',
+                'verbose_name_plural': 'записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'author'], name='timeline_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_userstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходный файл')),
+                ('kind', models.CharField(max_length=16, verbose_name='Назначение')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('mime_type', models.CharField(max_length=32, verbose_name='Тип')),
+                ('image', models.ImageField(upload_to='posts/variants/', verbose_name='Картинка')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_variants', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'версия картинки',
+                'verbose_name_plural': 'версии картинок',
+                'ordering': ('width',),
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+TABLES = ('posts_post_search', 'posts_comment_search')
+
+
+class Migration(migrations.Migration):
+    # Только таблицы индекса. Существующие посты и комментарии индексирует
+    # команда reindex_search пачками в своих транзакциях: заполнение здесь
+    # держало бы базу запертой на всё время миграции.
+
+    dependencies = [
+        ('posts', '0019_imagevariant'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                f'CREATE VIRTUAL TABLE {table} USING fts5('
+                f"terms, tokenize = 'unicode61 remove_diacritics 0')"
+                for table in TABLES
+            ],
+            [f'DROP TABLE {table}' for table in TABLES],
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(edited=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_comment_page_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='edited',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now,
+                verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Рейтинг существующих постов считает команда rebuild_trending пачками
+    # в своих транзакциях, а не миграция одной транзакцией.
+
+    dependencies = [
+        ('posts', '0023_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'рейтинг поста',
+                'verbose_name_plural': 'рейтинги постов',
+                'ordering': ('-score', '-post_id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingscore',
+            index=models.Index(fields=['score', 'post'], name='trending_score_idx'),
+        ),
+    ]
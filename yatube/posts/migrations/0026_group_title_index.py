@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_groupfollow'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200, verbose_name='Название группы'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'пользователь'), ('post', 'пост'), ('group', 'группа')], max_length=8, verbose_name='Что удаляем')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id объекта')),
+                ('name', models.CharField(max_length=150, verbose_name='Имя объекта')),
+                ('step', models.PositiveSmallIntegerField(default=0, verbose_name='Шаг')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Строк к удалению')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='Строк обработано')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Начато')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Закончено')),
+            ],
+            options={
+                'verbose_name': 'удаление',
+                'verbose_name_plural': 'удаления',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='deletionjob',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_deletion_job'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 
 
 UPLOAD_POSTS = 'posts/'
+UPLOAD_VARIANTS = 'posts/variants/'
 POST_STR = (
     '{text}\n'
     'Дата Публикации: {pub_date}\n'
@@ -13,7 +14,8 @@ User = get_user_model()
 
 
 class Group (models.Model):
-    title = models.CharField(max_length=200, verbose_name='Название группы')
+    title = models.CharField(
+        max_length=200, db_index=True, verbose_name='Название группы')
     slug = models.SlugField(unique=True, verbose_name='Имя страницы')
     description = models.TextField(verbose_name='Описание группы')
 
@@ -25,12 +27,42 @@ class Group (models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Без постов, которые удаляются, и постов удаляемых авторов."""
+        return self.exclude(
+            pk__in=DeletionJob.objects.object_ids('post')).exclude(
+                author_id__in=DeletionJob.objects.object_ids('user'))
+
+    def for_feed(self):
+        """Видимые посты, только поля для posts/includes/post.html."""
+        return self.visible().select_related('author', 'group').only(
+            'text', 'pub_date', 'edited', 'image',
+            'author', 'author__username',
+            'author__first_name', 'author__last_name',
+            'group', 'group__slug', 'group__title',
+        )
+
+    def for_detail(self):
+        """Пост со всеми полями, но без пароля и служебных полей автора."""
+        return self.visible().select_related('author', 'group').only(
+            'text', 'pub_date', 'edited', 'image', 'views',
+            'author', 'author__username',
+            'author__first_name', 'author__last_name',
+            'group', 'group__slug', 'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста')
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    edited = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -50,9 +82,27 @@ class Post(models.Model):
         upload_to=UPLOAD_POSTS,
         blank=True
     )
+    views = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Просмотры'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['pub_date', 'id'], name='post_feed_idx'),
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_feed_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_feed_idx'
+            ),
+        ]
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
 
@@ -67,6 +117,19 @@ class Post(models.Model):
         )
 
 
+class CommentQuerySet(models.QuerySet):
+    def visible(self):
+        """Без комментариев удаляемых авторов и к удаляемым постам."""
+        return self.exclude(
+            post_id__in=DeletionJob.objects.object_ids('post')).exclude(
+                author_id__in=DeletionJob.objects.object_ids('user'))
+
+    def for_display(self):
+        """Видимые комментарии, только поля posts/includes/comment.html."""
+        return self.visible().select_related('author').only(
+            'text', 'created', 'post', 'author', 'author__username')
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -88,8 +151,18 @@ class Comment(models.Model):
         verbose_name='Дата публикации'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_page_idx'),
+            # Список и разбивка по датам в админке.
+            models.Index(
+                fields=['created', 'id'], name='comment_created_idx'),
+        ]
         verbose_name = 'Коментарий'
         verbose_name_plural = 'Коментарии'
 
@@ -123,3 +196,172 @@ class Follow(models.Model):
         ]
         verbose_name = 'Подписчик'
         verbose_name_plural = 'Подписчики'
+
+
+class GroupFollow(models.Model):
+    """Подписка читателя на все посты группы."""
+    user = models.ForeignKey(
+        User,
+        related_name='group_follows',
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+    )
+    group = models.ForeignKey(
+        Group,
+        related_name='followers',
+        verbose_name='Группа',
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'group'],
+                name='unique_group_follow'
+            ),
+        ]
+        verbose_name = 'подписка на группу'
+        verbose_name_plural = 'подписки на группы'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+    )
+    # Копия даты поста: лента листается по индексу этой таблицы, не
+    # заглядывая в посты, которых на странице нет.
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='timeline_user_author_idx'
+            ),
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_feed_idx'
+            ),
+        ]
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются вместе с данными."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Коментариев', default=0)
+
+    class Meta:
+        verbose_name = 'статистика пользователя'
+        verbose_name_plural = 'статистика пользователей'
+
+
+class ImageVariant(models.Model):
+    """Готовая версия картинки поста заданной ширины и формата."""
+    post = models.ForeignKey(
+        Post,
+        related_name='image_variants',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    source = models.CharField('Исходный файл', max_length=255)
+    kind = models.CharField('Назначение', max_length=16)
+    width = models.PositiveIntegerField('Ширина')
+    mime_type = models.CharField('Тип', max_length=32)
+    image = models.ImageField('Картинка', upload_to=UPLOAD_VARIANTS)
+
+    class Meta:
+        ordering = ('width',)
+        verbose_name = 'версия картинки'
+        verbose_name_plural = 'версии картинок'
+
+
+class TrendingScore(models.Model):
+    """Место поста в популярной ленте, пересчитывается по событиям."""
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    score = models.FloatField('Рейтинг')
+
+    class Meta:
+        ordering = ('-score', '-post_id')
+        indexes = [
+            models.Index(fields=['score', 'post'], name='trending_score_idx'),
+        ]
+        verbose_name = 'рейтинг поста'
+        verbose_name_plural = 'рейтинги постов'
+
+
+class DeletionJobQuerySet(models.QuerySet):
+    def object_ids(self, kind):
+        """id объектов вида kind, которые выключены и удаляются."""
+        return self.filter(kind=kind).values('object_id')
+
+
+class DeletionJob(models.Model):
+    """Удаление пользователя, поста или группы по частям в фоне."""
+    KINDS = (
+        ('user', 'пользователь'),
+        ('post', 'пост'),
+        ('group', 'группа'),
+    )
+    kind = models.CharField('Что удаляем', max_length=8, choices=KINDS)
+    object_id = models.PositiveIntegerField('id объекта')
+    name = models.CharField('Имя объекта', max_length=150)
+    step = models.PositiveSmallIntegerField('Шаг', default=0)
+    total = models.PositiveIntegerField('Строк к удалению', default=0)
+    done = models.PositiveIntegerField('Строк обработано', default=0)
+    created = models.DateTimeField('Начато', auto_now_add=True)
+    finished = models.DateTimeField('Закончено', null=True, blank=True)
+
+    objects = DeletionJobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_deletion_job'
+            ),
+        ]
+        verbose_name = 'удаление'
+        verbose_name_plural = 'удаления'
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.name}'
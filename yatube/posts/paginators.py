@@ -0,0 +1,203 @@
+import heapq
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.encoding import force_bytes
+from django.utils.functional import SimpleLazyObject, cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .settings import ADMIN_COUNT_LIMIT
+
+AFTER = 'after'
+BEFORE = 'before'
+PK_MIN, PK_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def encode_cursor(value, pk):
+    # isoformat() сохраняет микросекунды, без них сравнение по ключу
+    # пропускало бы посты с одинаковой секундой публикации.
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    return urlsafe_base64_encode(force_bytes(json.dumps([value, pk])))
+
+
+def decode_cursor(token, field):
+    """Разбирает курсор; для битого токена возвращает None."""
+    try:
+        value, pk = json.loads(urlsafe_base64_decode(token).decode())
+        value, pk = field.to_python(value), int(pk)
+    except (TypeError, ValueError, OverflowError, ValidationError):
+        return None
+    # Сравнение с NULL базе не задать, а id вне 64 бит SQLite не примет.
+    if value is None or not PK_MIN <= pk <= PK_MAX:
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (key, pk) без COUNT и OFFSET.
+
+    Любая страница стоит одного запроса по индексу: берём per_page + 1
+    строк строго после (или до) курсора, лишняя строка говорит о том,
+    есть ли следующая страница. Ключом и pk могут быть аннотации
+    запроса, если листать нужно по столбцам связанной таблицы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, key='pub_date', pk='pk'):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.pk = pk
+        self.direction = None
+        self.cursor = None
+
+    def get_page(self, after=None, before=None):
+        annotation = self.object_list.query.annotations.get(self.key)
+        if annotation is not None:
+            field = annotation.output_field
+        else:
+            field = self.object_list.model._meta.get_field(self.key)
+        for direction, token in ((AFTER, after), (BEFORE, before)):
+            cursor = token and decode_cursor(token, field)
+            if cursor:
+                self.direction, self.cursor = direction, cursor
+                break
+        if self.direction == BEFORE:
+            # Номер страницы зависит от выборки, поэтому читаем сразу.
+            return self._get_page(self.rows, self.number, self)
+        return self._get_page(
+            SimpleLazyObject(lambda: self.rows), self.number, self)
+
+    def _value(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.key], obj[self.pk]
+        return getattr(obj, self.key), getattr(obj, self.pk)
+
+    def _filter(self, objects, lookup):
+        value, pk = self.cursor
+        # Одно OR SQLite не превращает в диапазон индекса и читает его с
+        # начала; нестрогая граница по ключу даёт поиск по индексу.
+        bound = 'gte' if lookup == 'gt' else 'lte'
+        return objects.filter(
+            Q(**{f'{self.key}__{bound}': value}),
+            Q(**{f'{self.key}__{lookup}': value})
+            | Q(**{self.key: value, f'{self.pk}__{lookup}': pk}),
+        )
+
+    def _slice(self, objects, ascending):
+        """per_page + 1 строк после курсора в порядке ключа."""
+        # Столбец, а не pk: первичный ключ-связь сортировался бы по
+        # ordering связанной модели.
+        pk = objects.model._meta.pk.attname if self.pk == 'pk' else self.pk
+        if self.cursor:
+            objects = self._filter(objects, 'gt' if ascending else 'lt')
+        order = (self.key, pk) if ascending else (f'-{self.key}', f'-{pk}')
+        return list(objects.order_by(*order)[:self.per_page + 1])
+
+    def _fetch(self, ascending):
+        return self._slice(self.object_list, ascending)
+
+    @cached_property
+    def _fetched(self):
+        limit = self.per_page + 1
+        if self.direction == BEFORE:
+            rows = self._fetch(ascending=True)
+            more = len(rows) == limit
+            rows = rows[:self.per_page][::-1]
+            return rows, True, more
+        rows = self._fetch(ascending=False)
+        return rows[:self.per_page], len(rows) == limit, bool(self.cursor)
+
+    @property
+    def rows(self):
+        return self._fetched[0]
+
+    @property
+    def has_next(self):
+        return self._fetched[1]
+
+    @property
+    def has_previous(self):
+        return self._fetched[2]
+
+    @property
+    def number(self):
+        if self.direction == BEFORE:
+            return 2 if self.has_previous else 1
+        return 2 if self.direction == AFTER else 1
+
+    @property
+    def num_pages(self):
+        return self.number + 1 if self.has_next else self.number
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.rows:
+            return encode_cursor(*self._value(self.rows[-1]))
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.rows:
+            return encode_cursor(*self._value(self.rows[0]))
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсор по нескольким запросам с общим ключом: k-way merge.
+
+    Из каждого источника читается не больше per_page + 1 строк после
+    курсора, списки сливаются heapq.merge, а строка, пришедшая из
+    нескольких источников, остаётся одна. Страница стоит одного запроса
+    на источник независимо от того, сколько в них строк.
+    """
+    def __init__(self, sources, per_page, key='pub_date', pk='pk'):
+        super().__init__(sources[0], per_page, key, pk)
+        self.sources = sources
+
+    def _fetch(self, ascending):
+        merged = heapq.merge(
+            *(self._slice(objects, ascending) for objects in self.sources),
+            key=self._value, reverse=not ascending)
+        rows, seen = [], set()
+        for row in merged:
+            pk = self._value(row)[1]
+            if pk not in seen:
+                seen.add(pk)
+                rows.append(row)
+                if len(rows) > self.per_page:
+                    break
+        return rows
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки без полного COUNT(*) по огромным таблицам.
+
+    Без фильтров число строк оценивается по наибольшему id: id в SQLite
+    не переиспользуются, так что оценка не меньше настоящего числа. С
+    фильтром строки считаются не дальше ADMIN_COUNT_LIMIT, и страницы
+    за этим пределом не показываются. Таблицы меньше предела считаются
+    точно.
+    """
+    @cached_property
+    def count(self):
+        objects = self.object_list.order_by()
+        if not objects.query.where:
+            last = objects.aggregate(last=Max('pk'))['last'] or 0
+            if last > ADMIN_COUNT_LIMIT:
+                return last
+        return objects[:ADMIN_COUNT_LIMIT].count()
+
+
+def cursor_paginator(objects, per_page, key='pub_date', pk='pk'):
+    """Пагинатор запроса или слияния списка запросов."""
+    if isinstance(objects, list):
+        return MergedCursorPaginator(objects, per_page, key, pk)
+    return CursorPaginator(objects, per_page, key, pk)
+
+
+def get_cursor_page(request, objects, per_page, key='pub_date', pk='pk'):
+    return cursor_paginator(objects, per_page, key, pk).get_page(
+        after=request.GET.get(AFTER),
+        before=request.GET.get(BEFORE),
+    )
@@ -0,0 +1,115 @@
+"""Полнотекстовый поиск по постам и комментариям.
+
+Индекс — таблицы SQLite FTS5, где rowid совпадает с pk объекта, а в
+колонке terms лежат основы слов после стеммера. Запрос проходит через
+тот же стеммер, поэтому «котов» находит пост про «кота».
+
+Миграция только создаёт таблицы, уже существующие тексты индексирует
+команда reindex_search, новые и изменённые — сигналы.
+"""
+import re
+
+from django.db import connection, transaction
+
+from .models import Comment, Post
+from .settings import SEARCH_COMMENT_WEIGHT, SEARCH_MAX_RESULTS
+from .stemmer import stem
+
+POST_INDEX = 'posts_post_search'
+COMMENT_INDEX = 'posts_comment_search'
+INDEXES = {Post: POST_INDEX, Comment: COMMENT_INDEX}
+WORD = re.compile(r'\w+')
+SEARCH_POSTS = f'''
+SELECT post_id FROM (
+    SELECT rowid AS post_id, bm25({POST_INDEX}) AS score
+    FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %s
+    UNION ALL
+    SELECT comment.post_id, bm25({COMMENT_INDEX}) * %s
+    FROM {COMMENT_INDEX}
+    JOIN posts_comment AS comment ON comment.id = {COMMENT_INDEX}.rowid
+    WHERE {COMMENT_INDEX} MATCH %s
+)
+GROUP BY post_id
+ORDER BY MIN(score), post_id DESC
+LIMIT %s
+'''
+
+
+def terms(text):
+    return [stem(word) for word in WORD.findall(text)]
+
+
+def match_query(text):
+    """Запрос FTS5: все основы обязательны, каждая как префикс."""
+    return ' '.join(f'"{term}"*' for term in terms(text))
+
+
+def index_objects(table, rows, replace=True):
+    """Записывает в индекс строки (pk, text), заменяя старые."""
+    rows = [(pk, ' '.join(terms(text))) for pk, text in rows]
+    with connection.cursor() as cursor:
+        if replace:
+            cursor.executemany(
+                f'DELETE FROM {table} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows])
+        cursor.executemany(
+            f'INSERT INTO {table} (rowid, terms) VALUES (%s, %s)', rows)
+
+
+def update(instance, created=False):
+    index_objects(
+        INDEXES[type(instance)], [(instance.pk, instance.text)],
+        replace=not created)
+
+
+def remove(instance):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {INDEXES[type(instance)]} WHERE rowid = %s',
+            [instance.pk])
+
+
+def search_ids(table, text, limit=SEARCH_MAX_RESULTS):
+    """pk объектов одной таблицы индекса, лучшие совпадения первыми."""
+    query = match_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s '
+            f'ORDER BY bm25({table}) LIMIT %s', [query, limit])
+        return [pk for pk, in cursor.fetchall()]
+
+
+def search_posts(text, limit=SEARCH_MAX_RESULTS):
+    """pk постов, подходящих по тексту или по комментариям.
+
+    Совпадение в комментарии весит меньше совпадения в самом посте.
+    """
+    query = match_query(text)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SEARCH_POSTS, [query, SEARCH_COMMENT_WEIGHT, query, limit])
+        return [pk for pk, in cursor.fetchall()]
+
+
+def reindex(model, batch_size):
+    """Строит индекс модели заново, читая таблицу пачками."""
+    table = INDEXES[model]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+    rows = model.objects.order_by('pk').values_list('pk', 'text')
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            with transaction.atomic():
+                index_objects(table, batch, replace=False)
+            yield len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            index_objects(table, batch, replace=False)
+        yield len(batch)
@@ -0,0 +1,76 @@
+"""Детерминированный генератор данных для нагрузочных замеров.
+
+Одинаковые seed и масштаб дают одинаковые строки, поэтому отчёты
+benchmark_views разных прогонов можно сравнивать. Строки идут через
+Importer, так что ленты подписок, поиск и счётчики строятся так же, как
+при обычном импорте.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+from faker import Faker
+
+from .models import Comment, Post
+from .transfer import Importer
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+PERIOD = timedelta(days=365 * 3)
+# Чем больше степень, тем сильнее подписки и комментарии тяготеют к
+# первым авторам и свежим постам, как в живой ленте.
+SKEW = 3
+GROUP_SHARE = 0.7
+
+
+def skewed(rng, count):
+    return int(count * rng.random() ** SKEW)
+
+
+def generate(users, groups, posts, comments, follows, seed=0):
+    """Строки для Importer.load в порядке групп, постов, комментариев."""
+    rng = random.Random(seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    usernames = [f'bench{i}' for i in range(users)]
+    slugs = [f'bench-{i}' for i in range(groups)]
+    for slug in slugs:
+        yield {
+            'model': 'group', 'slug': slug,
+            'title': fake.sentence(nb_words=3)[:200],
+            'description': fake.text(200),
+        }
+    first_post = (Post.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0) + 1
+    for i in range(posts):
+        author = usernames[skewed(rng, users)]
+        group = slugs[rng.randrange(groups)] if (
+            slugs and rng.random() < GROUP_SHARE) else None
+        yield {
+            'model': 'post', 'id': first_post + i,
+            'text': fake.text(400),
+            # Посты идут по времени, как если бы их публиковали подряд.
+            'pub_date': (START + PERIOD * i / max(posts, 1)).isoformat(),
+            'author': author,
+            'group': group,
+            'image': '',
+        }
+    first_comment = (Comment.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0) + 1
+    for i in range(comments if posts else 0):
+        post = posts - 1 - skewed(rng, posts)
+        yield {
+            'model': 'comment', 'id': first_comment + i,
+            'post': first_post + post,
+            'author': usernames[rng.randrange(users)],
+            'text': fake.sentence(),
+            'created': (START + PERIOD * (post + 1) / posts).isoformat(),
+        }
+    for _ in range(follows if users > 1 else 0):
+        yield {
+            'model': 'follow',
+            'user': usernames[rng.randrange(users)],
+            'author': usernames[skewed(rng, users)],
+        }
+
+
+def seed(batch_size, **scale):
+    return Importer(batch_size).load(generate(**scale))
@@ -1 +1,90 @@
 COUNT_POSTS_IN_PAGE = 10
+COUNT_COMMENTS_IN_PAGE = 20
+# Авторов с таким числом подписчиков не раскладываем по лентам при
+# публикации, их посты подмешиваются в ленту при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+# Обратно к раскладке автор возвращается, только когда подписчиков
+# становится меньше этого числа.
+TIMELINE_FANOUT_RESUME = 500
+TIMELINE_BACKFILL_POSTS = 1000
+TIMELINE_BATCH_SIZE = 500
+# Сколько секунд живёт блокировка множества авторов для чтения напрямую,
+# если взявший её процесс упал, не отпустив.
+TIMELINE_LOCK_TIMEOUT = 10
+# Массивы графа подписок: срок, после которого массив строится заново,
+# даже если его удаление разминулось с чтением.
+FOLLOW_GRAPH_TIMEOUT = 60 * 60
+# Миниатюры, которые используют шаблоны постов: (геометрия, опции).
+THUMBNAIL_GEOMETRIES = {
+    'feed': ('650x200', {'crop': 'center', 'upscale': True}),
+    'detail': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_PENDING_TIMEOUT = 300
+# Адаптивные версии картинок поста: кадр (ширина, высота) как у
+# миниатюры, ширины для srcset и атрибут sizes.
+IMAGE_VARIANTS = {
+    'feed': {
+        'box': (650, 200),
+        'widths': (325, 650, 1300),
+        'sizes': '(max-width: 768px) 100vw, 650px',
+    },
+    'detail': {
+        'box': (960, 339),
+        'widths': (480, 960, 1920),
+        'sizes': '(max-width: 768px) 100vw, 960px',
+    },
+}
+# Современные форматы пишутся, только если их поддерживает Pillow.
+IMAGE_VARIANT_FORMATS = (
+    ('AVIF', 'avif', 'image/avif'),
+    ('WEBP', 'webp', 'image/webp'),
+    ('JPEG', 'jpg', 'image/jpeg'),
+)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_BATCH_SIZE = 100
+# Поиск: сколько лучших совпадений выдаём и во сколько раз совпадение
+# в комментарии слабее совпадения в тексте поста.
+SEARCH_MAX_RESULTS = 1000
+SEARCH_COMMENT_WEIGHT = 0.5
+SEARCH_BATCH_SIZE = 1000
+# Импорт и экспорт JSON Lines: строк в одной пачке.
+TRANSFER_BATCH_SIZE = 1000
+# Готовый HTML поста в ленте: ключ меняется при правке, поэтому срок
+# нужен только чтобы вытеснять старые версии.
+POST_HTML_TIMEOUT = 7 * 24 * 60 * 60
+# Фрагмент с запасной картинкой, пока версии не посчитаны, живёт
+# недолго: готовые версии должны появиться в ленте без правки поста.
+POST_HTML_FALLBACK_TIMEOUT = 60
+# Просмотры постов копятся в памяти процесса и пишутся в базу пачкой:
+# после стольких просмотров или через столько секунд.
+VIEWS_FLUSH_THRESHOLD = 100
+VIEWS_FLUSH_INTERVAL = 10
+# Популярная лента: вес событий и период, за который вклад события
+# убывает вдвое. Подписка поднимает несколько последних постов автора.
+TRENDING_WEIGHTS = {
+    'post': 1,
+    'comment': 3,
+    'follow': 2,
+    'view': 0.1,
+}
+TRENDING_HALF_LIFE = 12 * 60 * 60
+TRENDING_FOLLOW_POSTS = 5
+TRENDING_BATCH_SIZE = 1000
+# Кэш поиска автора, группы и поста: срок найденного объекта и записи
+# о том, что объекта нет.
+IDENTITY_TIMEOUT = 24 * 60 * 60
+IDENTITY_MISSING_TIMEOUT = 60
+# Пост правится часто, а промах, разминувшийся с правкой, может
+# сохранить старую версию: она живёт не дольше этого срока.
+IDENTITY_POST_TIMEOUT = 5 * 60
+IDENTITY_FORGET_BATCH_SIZE = 500
+# Выбор группы в форме поста: список из кэша или, когда групп слишком
+# много для <select>, поле с подсказками по началу названия.
+GROUP_SELECT_AUTOCOMPLETE = False
+GROUP_CHOICES_TIMEOUT = 24 * 60 * 60
+GROUP_AUTOCOMPLETE_LIMIT = 20
+# Админка: до стольких строк списки считаются точно, дальше — оценкой.
+ADMIN_COUNT_LIMIT = 10000
+# Удаление по частям: строк зависимых объектов в одной транзакции.
+DELETION_BATCH_SIZE = 500
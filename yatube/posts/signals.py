@@ -0,0 +1,203 @@
+from django.db.models.signals import (
+    post_delete, post_init, post_migrate, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    follow_graph, group_choices, identity, search, stats, timeline, trending
+)
+from .apps import PostsConfig
+from .caching import bump_generations
+from .models import (
+    Comment, Follow, Group, GroupFollow, Post, User, UserStats
+)
+
+COUNTERS = {Post: 'posts_count', Comment: 'comments_count'}
+IDENTITY_FIELDS = {User: 'username', Group: 'slug'}
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_follow_graph(sender, instance, **kwargs):
+    follow_graph.forget([instance])
+
+
+@receiver(post_migrate)
+def reset_caches(sender, **kwargs):
+    # migrate и flush меняют таблицы в обход сигналов.
+    if sender.name == PostsConfig.name:
+        follow_graph.reset()
+        identity.reset()
+        group_choices.reset()
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    timeline.remove_follow(instance)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def count_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.change(instance.author_id, 'followers_count', 1)
+        stats.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    stats.change(instance.author_id, 'followers_count', -1)
+    stats.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._old_group_id = instance.pk and Post.objects.filter(
+        pk=instance.pk).values_list('group', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_feeds(sender, instance, **kwargs):
+    scopes = {
+        ('index',), ('trending',), ('profile', instance.author_id),
+        ('post', instance.pk),
+    }
+    old_group_id = getattr(instance, '_old_group_id', None)
+    for group_id in (instance.group_id, old_group_id):
+        if group_id:
+            scopes.add(('group', group_id))
+    bump_generations(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_post_page(sender, instance, **kwargs):
+    bump_generations(('post', instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_feeds(sender, instance, **kwargs):
+    bump_generations(('groups',), ('group', instance.pk))
+
+
+@receiver(post_save, sender=GroupFollow)
+@receiver(post_delete, sender=GroupFollow)
+def bump_group_follows(sender, instance, **kwargs):
+    bump_generations(('group_follows', instance.user_id))
+
+
+@receiver(post_save, sender=User)
+def bump_author_feeds(sender, instance, created, update_fields, **kwargs):
+    # Вход пользователя сохраняет только last_login, ленты он не меняет.
+    if update_fields and not {'first_name', 'last_name', 'username'} & set(
+            update_fields):
+        return
+    bump_generations(('authors',), ('profile', instance.pk))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def update_search_index(sender, instance, created, update_fields, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.update(instance, created)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove(instance)
+
+
+@receiver(post_save, sender=Post)
+def add_to_trending(sender, instance, created, **kwargs):
+    if created:
+        trending.add_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def raise_commented_post(sender, instance, created, **kwargs):
+    if created:
+        trending.add_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def raise_followed_author(sender, instance, created, **kwargs):
+    if created:
+        trending.add_follow(instance)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Group)
+def remember_identity(sender, instance, **kwargs):
+    # Старое имя нужно, чтобы после переименования забыть и его запись.
+    # Отложенное поле не читаем: это был бы лишний запрос.
+    field = IDENTITY_FIELDS[sender]
+    instance._identity = instance.__dict__.get(field)
+
+
+@receiver(post_save, sender=User)
+def forget_user(sender, instance, created, update_fields, **kwargs):
+    if update_fields and not {'first_name', 'last_name', 'username'} & set(
+            update_fields):
+        return
+    # Новое имя могло быть записано в кэш как отсутствующее.
+    identity.forget('user', instance._identity, instance.username)
+    if not created:
+        identity.forget_author_posts(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    identity.forget('user', instance._identity, instance.username)
+
+
+@receiver(post_save, sender=Group)
+def forget_group(sender, instance, created, **kwargs):
+    identity.forget('group', instance._identity, instance.slug)
+    if not created:
+        identity.forget_group_posts(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def forget_deleted_group(sender, instance, **kwargs):
+    # После удаления у постов группы уже не будет, ищем их заранее.
+    identity.forget('group', instance._identity, instance.slug)
+    identity.forget_group_posts(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    identity.forget('post', instance.pk)
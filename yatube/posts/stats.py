@@ -0,0 +1,62 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .caching import bump_generations
+from .models import Comment, Follow, Post, User, UserStats
+
+COUNTERS = (
+    ('posts_count', Post, 'author'),
+    ('followers_count', Follow, 'author'),
+    ('following_count', Follow, 'user'),
+    ('comments_count', Comment, 'author'),
+)
+
+
+def change(user_id, counter, delta):
+    # Строки может ещё не быть: её посчитает get_user_stats при чтении.
+    UserStats.objects.filter(user_id=user_id).update(
+        **{counter: F(counter) + delta})
+    bump_generations(('stats', user_id))
+
+
+def count_stats(user_ids):
+    stats = {
+        user_id: UserStats(user_id=user_id) for user_id in user_ids
+    }
+    for counter, model, field in COUNTERS:
+        rows = model.objects.filter(
+            **{f'{field}__in': user_ids}).values(field).annotate(
+                total=Count('pk')).order_by()
+        for row in rows:
+            setattr(stats[row[field]], counter, row['total'])
+    return list(stats.values())
+
+
+def rebuild(user_ids):
+    stats = count_stats(user_ids)
+    with transaction.atomic():
+        UserStats.objects.filter(user_id__in=user_ids).delete()
+        UserStats.objects.bulk_create(stats, ignore_conflicts=True)
+    bump_generations(*(('stats', user_id) for user_id in user_ids))
+    return stats
+
+
+def get_user_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return rebuild([user.pk])[0]
+
+
+def rebuild_all(batch_size):
+    user_ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for user_id in user_ids.iterator():
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            rebuild(batch)
+            yield len(batch)
+            batch = []
+    if batch:
+        rebuild(batch)
+        yield len(batch)
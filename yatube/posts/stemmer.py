@@ -0,0 +1,132 @@
+"""Стеммер Портера (Snowball) для русского языка.
+
+Отрезает окончания, чтобы «котов», «коты» и «кот» попадали в индекс
+одной основой. Слова не на кириллице возвращаются как есть.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой',
+        'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых',
+        'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ((), ('ост', 'ость'))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+CYRILLIC = re.compile('^[а-я]+$')
+
+
+def _region(word, start=0):
+    """Начало части слова после первой пары «гласная, согласная»."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip(word, groups):
+    """Отрезает самое длинное окончание из групп.
+
+    Окончания первой группы допустимы только после «а» или «я».
+    Возвращает None, если окончание не подошло.
+    """
+    found = max(
+        (
+            (len(ending), group)
+            for group, endings in enumerate(groups)
+            for ending in endings if word.endswith(ending)
+        ),
+        default=None,
+    )
+    if found is None:
+        return None
+    length, second_group = found
+    stem = word[:-length]
+    if not second_group and not stem.endswith(('а', 'я')):
+        return None
+    return stem
+
+
+def _strip_inflection(rv):
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    adjective = _strip(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _strip(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for groups in (VERB, NOUN):
+        stripped = _strip(rv, groups)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def _tidy_up(rv):
+    superlative = _strip(rv, SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        return rv[:-1]
+    if superlative is None and rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+# Словарь живых текстов невелик, повторные слова берём из кэша.
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    if not CYRILLIC.match(word):
+        return word
+    for i, letter in enumerate(word):
+        if letter in VOWELS:
+            break
+    else:
+        return word
+    # Окончания ищем только в RV, части после первой гласной.
+    prefix, rv = word[:i + 1], word[i + 1:]
+    r2 = max(_region(word, _region(word)) - len(prefix), 0)
+    rv = _strip_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    derivational = _strip(rv[r2:], DERIVATIONAL)
+    if derivational is not None:
+        rv = rv[:r2] + derivational
+    return prefix + _tidy_up(rv)
@@ -0,0 +1,23 @@
+from django import template
+
+from posts import fragments
+from posts.images import get_picture
+from posts.thumbnails import is_pending
+
+register = template.Library()
+
+
+@register.filter
+def thumbnail_pending(post):
+    return is_pending(post)
+
+
+@register.simple_tag
+def post_fragments(page_obj, hide_group=False):
+    """HTML постов страницы: фрагменты из кэша, промахи рендерятся."""
+    return fragments.render_posts(page_obj, hide_group=hide_group)
+
+
+@register.filter
+def picture(post, kind):
+    return get_picture(post, kind)
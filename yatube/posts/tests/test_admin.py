@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import paginators
+from ..models import Comment, Follow, Group, GroupFollow, Post, User
+
+
+def changelist(name):
+    return reverse(f'admin:posts_{name}_changelist')
+
+
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='root', email='root@example.com', password='root')
+        cls.group = Group.objects.create(
+            title='Коты', slug='cats', description='')
+        Group.objects.create(title='Собаки', slug='dogs', description='')
+        cls.users = [
+            User.objects.create_user(username=f'user{i}') for i in range(3)
+        ]
+        for user in cls.users:
+            post = Post.objects.create(
+                author=user, text='Тестовый пост', group=cls.group)
+            Comment.objects.create(post=post, author=user, text='Коментарий')
+            Follow.objects.create(user=user, author=cls.admin)
+            GroupFollow.objects.create(user=user, group=cls.group)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_rows_do_not_add_queries(self):
+        """Связанные объекты строк приходят вместе со списком."""
+        for name, count in [['post', 7], ['comment', 7], ['follow', 5],
+                            ['groupfollow', 5], ['group', 5]]:
+            with self.subTest(name=name):
+                with self.assertNumQueries(count):
+                    response = self.client.get(changelist(name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_estimated_count(self):
+        """Число строк сверх предела оценивается, а не считается."""
+        with mock.patch.object(paginators, 'ADMIN_COUNT_LIMIT', 2):
+            response = self.client.get(changelist('post'))
+            self.assertEqual(
+                response.context['cl'].result_count,
+                Post.objects.latest('pk').pk)
+            response = self.client.get(
+                changelist('post'), {'group__id__exact': self.group.pk})
+            self.assertEqual(response.context['cl'].result_count, 2)
+
+    def test_username_search(self):
+        response = self.client.get(changelist('follow'), {'q': 'user1'})
+        self.assertEqual(
+            [follow.user for follow in response.context['cl'].result_list],
+            [self.users[1]])
+
+    def test_group_autocomplete(self):
+        """Подсказки групп ищут по началу названия."""
+        response = self.client.get(
+            reverse('admin:posts_group_autocomplete'), {'term': 'кот'})
+        self.assertEqual(
+            [group['text'] for group in response.json()['results']],
+            ['Коты'])
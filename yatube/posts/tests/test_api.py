@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..settings import COUNT_POSTS_IN_PAGE
+
+GROUP_SLUG = 'test-slug'
+USERNAME = 'auth'
+USERNAME_2 = 'reader'
+URL_API_INDEX = reverse('api:index')
+URL_API_GROUP = reverse('api:group_list', args=[GROUP_SLUG])
+URL_API_PROFILE = reverse('api:profile', args=[USERNAME])
+URL_API_FOLLOW = reverse('api:follow_index')
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cache.clear()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.reader = User.objects.create_user(username=USERNAME_2)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=GROUP_SLUG, description='Описание')
+        cls.count_posts_in_2_page = 3
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(COUNT_POSTS_IN_PAGE + cls.count_posts_in_2_page)
+        )
+        cls.post = Post.objects.latest('pk')
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Коментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        cls.URL_API_POST = reverse('api:post_detail', args=[cls.post.pk])
+        cls.URL_API_COMMENTS = reverse(
+            'api:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_pages(self):
+        """Ленты листаются курсором из ссылки next."""
+        self.client.force_login(self.reader)
+        for address in [URL_API_INDEX, URL_API_GROUP, URL_API_PROFILE,
+                        URL_API_FOLLOW]:
+            with self.subTest(address=address):
+                first = self.client.get(address).json()
+                self.assertEqual(len(first['results']), COUNT_POSTS_IN_PAGE)
+                second = self.client.get(first['next']).json()
+                self.assertEqual(
+                    len(second['results']), self.count_posts_in_2_page)
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0], {
+                    'id': self.post.pk,
+                    'text': self.post.text,
+                    'pub_date': first['results'][0]['pub_date'],
+                    'author': USERNAME,
+                    'group': GROUP_SLUG,
+                    'image': None,
+                })
+
+    def test_fields(self):
+        """?fields= оставляет только нужные поля, незнакомые — ошибка."""
+        response = self.client.get(URL_API_INDEX, {'fields': 'id,author'})
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.pk, 'author': USERNAME})
+        self.assertIn('fields=id%2Cauthor', response.json()['next'])
+        response = self.client.get(URL_API_INDEX, {'fields': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_and_comments(self):
+        """Пост и его комментарии отдаются словарями."""
+        response = self.client.get(self.URL_API_POST, {'fields': 'text'})
+        self.assertEqual(response.json(), {'text': self.post.text})
+        comments = self.client.get(self.URL_API_COMMENTS).json()['results']
+        self.assertEqual(
+            [(comment['author'], comment['text']) for comment in comments],
+            [(USERNAME_2, 'Коментарий')])
+
+    def test_errors(self):
+        """Гостю лента подписок закрыта, несуществующее — 404."""
+        self.assertEqual(self.client.get(URL_API_FOLLOW).status_code, 401)
+        for address in [reverse('api:post_detail', args=[0]),
+                        reverse('api:group_list', args=['missing'])]:
+            with self.subTest(address=address):
+                self.assertEqual(self.client.get(address).status_code, 404)
+
+    def test_page_in_one_query(self):
+        """Страница ленты — один запрос к базе."""
+        with self.assertNumQueries(1):
+            self.client.get(URL_API_INDEX)
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post
+from ..seeding import generate
+
+SCALE = {'users': 5, 'groups': 2, 'posts': 30, 'comments': 20, 'follows': 10}
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generator_is_deterministic(self):
+        """Один seed — одни и те же строки."""
+        self.assertEqual(
+            list(generate(seed=1, **SCALE)), list(generate(seed=1, **SCALE)))
+        self.assertNotEqual(
+            list(generate(seed=1, **SCALE)), list(generate(seed=2, **SCALE)))
+
+    def test_seed_and_report(self):
+        """seed_data заполняет базу, benchmark_views пишет отчёт."""
+        call_command(
+            'seed_data', *[f'--{name}={value}' for name, value in
+                           SCALE.items()], stdout=StringIO())
+        self.assertEqual(Post.objects.count(), SCALE['posts'])
+        self.assertEqual(Comment.objects.count(), SCALE['comments'])
+        self.assertTrue(Follow.objects.exists())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark_views', output=path, iterations=2,
+                stdout=StringIO())
+            with open(path, encoding='utf-8') as file:
+                report = json.load(file)
+        self.assertEqual(report['meta']['rows']['post'], SCALE['posts'])
+        for name in ('index', 'profile', 'post_detail', 'follow_index'):
+            with self.subTest(view=name):
+                result = report['views'][name]
+                self.assertEqual(result['status'], 200)
+                self.assertIn('p99_ms', result)
+                self.assertIn('queries', result)
@@ -0,0 +1,142 @@
+from io import StringIO
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import deletion, identity
+from ..models import (
+    Comment, DeletionJob, Follow, Group, GroupFollow, Post, User
+)
+
+
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(3)
+        ]
+        cls.own_post = Post.objects.create(
+            author=cls.reader, text='Пост читателя', group=cls.group)
+        for post in cls.posts:
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Коментарий')
+        Comment.objects.create(
+            post=cls.own_post, author=cls.user, text='Коментарий')
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+
+    def test_start_disables_user(self):
+        """Пользователь выключается сразу, строки ещё на месте."""
+        job = deletion.start('user', self.user)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        self.assertIsNone(identity.find_user('auth'))
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+        # Записи лент, 4 коментария, подписка и 3 поста.
+        self.assertEqual(job.total, 3 + 4 + 1 + 3)
+        self.assertEqual(deletion.start('user', self.user), job)
+
+    def test_user_deleted_in_chunks(self):
+        job = deletion.start('user', self.user)
+        progress = list(deletion.run(job, batch_size=2))
+        self.assertEqual(progress[-1], job.total)
+        self.assertGreater(len(progress), 1)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(
+            list(Comment.objects.values_list('post', flat=True)), [])
+        self.assertEqual(list(Post.objects.all()), [self.own_post])
+        # Счётчики читателя уменьшились сигналами.
+        stats = User.objects.get(pk=self.reader.pk).stats
+        self.assertEqual(
+            (stats.comments_count, stats.following_count), (0, 0))
+        self.assertIsNotNone(DeletionJob.objects.get(pk=job.pk).finished)
+
+    def test_interrupted_job_resumes(self):
+        """Прерванное задание продолжается с сохранённого шага."""
+        job = deletion.start('user', self.user)
+        list(islice(deletion.run(job, batch_size=1), 4))
+        job = DeletionJob.objects.get(pk=job.pk)
+        self.assertEqual(job.done, 4)
+        out = StringIO()
+        call_command('run_deletions', stdout=out)
+        self.assertIn(f'{job.total} из {job.total}', out.getvalue())
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_group_posts_detached(self):
+        """Посты группы остаются, группа удаляется."""
+        job = deletion.start('group', self.group)
+        self.assertIsNone(identity.find_group('test-slug'))
+        list(deletion.run(job, batch_size=3))
+        self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 4)
+        self.assertFalse(GroupFollow.objects.exists())
+
+    def test_disabled_posts_hidden(self):
+        """Удаляемый пост и посты удаляемого автора нигде не видны."""
+        cache.clear()
+        deletion.start('post', self.own_post)
+        deletion.start('user', self.user)
+        self.client.force_login(self.reader)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=['test-slug']),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:search') + '?q=пост',
+            reverse('api:index'),
+            reverse('api:group_list', args=['test-slug']),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotContains(response, 'Пост 0')
+                self.assertNotContains(response, 'Пост читателя')
+        for post in (self.posts[0], self.own_post):
+            for name in ('api:post_detail', 'api:post_comments'):
+                with self.subTest(name=name, post=post.text):
+                    response = self.client.get(reverse(name, args=[post.pk]))
+                    self.assertEqual(response.status_code, 404)
+
+    def test_disabled_comments_hidden(self):
+        """Комментарии удаляемого автора не видны на странице поста."""
+        cache.clear()
+        Comment.objects.create(
+            post=self.posts[1], author=self.user, text='Ответ автора')
+        deletion.start('user', self.reader)
+        post_id = self.posts[1].pk
+        urls = [
+            reverse('posts:post_detail', args=[post_id]),
+            reverse('posts:post_comments', args=[post_id]),
+            reverse('api:post_comments', args=[post_id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Ответ автора')
+                self.assertNotContains(response, 'Коментарий')
+
+    def test_admin_action(self):
+        admin = User.objects.create_superuser(
+            username='root', email='root@example.com', password='root')
+        self.client.force_login(admin)
+        post = self.posts[0]
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'delete_in_background',
+            '_selected_action': [post.pk],
+        })
+        job = DeletionJob.objects.get(kind='post', object_id=post.pk)
+        # Запись в ленте читателя и коментарий.
+        self.assertEqual(job.total, 2)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertEqual(response.status_code, 404)
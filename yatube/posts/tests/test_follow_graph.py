@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from .. import follow_graph
+from ..models import Follow, User
+
+
+# Массивы кэшируются только вне транзакции, поэтому тесты идут без
+# обёртки TestCase.
+class FollowGraphTests(TransactionTestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in reversed(self.authors):
+            Follow.objects.create(user=self.reader, author=author)
+
+    def test_sorted_and_cached(self):
+        """Массив отсортирован, повторное чтение не ходит в базу."""
+        with self.assertNumQueries(1):
+            following = follow_graph.get_following(self.reader.pk)
+        self.assertEqual(
+            list(following), sorted(author.pk for author in self.authors))
+        with self.assertNumQueries(0):
+            self.assertTrue(follow_graph.is_following(
+                self.reader.pk, self.authors[0].pk))
+            self.assertFalse(follow_graph.is_following(
+                self.reader.pk, self.reader.pk))
+
+    def test_follow_and_unfollow_drop_cached_arrays(self):
+        """Подписка и отписка удаляют массивы, чтение строит их заново."""
+        author = self.authors[1]
+        follow_graph.get_following(self.reader.pk)
+        follow_graph.get_followers(author.pk)
+        newcomers = [
+            User.objects.create_user(username=f'newcomer{i}')
+            for i in range(2)
+        ]
+        for newcomer in newcomers:
+            Follow.objects.create(user=newcomer, author=author)
+        Follow.objects.filter(user=self.reader, author=author).delete()
+        with self.assertNumQueries(1):
+            self.assertFalse(
+                follow_graph.is_following(self.reader.pk, author.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(follow_graph.get_followers(author.pk)),
+                [newcomer.pk for newcomer in newcomers])
+
+    def test_rolled_back_follow_not_cached(self):
+        """Собранное внутри откаченной транзакции в кэш не попадает."""
+        newcomer = User.objects.create_user(username='newcomer')
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=newcomer, author=self.reader)
+                self.assertTrue(
+                    follow_graph.is_following(newcomer.pk, self.reader.pk))
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertFalse(
+            follow_graph.is_following(newcomer.pk, self.reader.pk))
+
+    def test_reset(self):
+        """После reset массивы строятся заново."""
+        follow_graph.get_following(self.reader.pk)
+        follow_graph.reset()
+        with self.assertNumQueries(1):
+            follow_graph.get_following(self.reader.pk)
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django import forms
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import forms as post_forms
+from ..models import Group, Post, User
+
+URL_CREATE = reverse('posts:create')
+URL_AUTOCOMPLETE = reverse('api:group_autocomplete')
+
+
+def create_groups(*titles):
+    return [
+        Group.objects.create(title=title, slug=f'group-{i}', description='')
+        for i, title in enumerate(titles)
+    ]
+
+
+# Список кэшируется только вне транзакции, поэтому тест идёт без
+# обёртки TestCase.
+class GroupChoicesCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client.force_login(self.user)
+        create_groups('Коты', 'Собаки')
+
+    def test_choices_cached_until_group_changes(self):
+        self.client.get(URL_CREATE)
+        with self.assertNumQueries(0):
+            choices = list(post_forms.PostForm().fields['group'].choices)
+        self.assertEqual(
+            [title for pk, title in choices], ['---------', 'Коты', 'Собаки'])
+        Group.objects.create(title='Аисты', slug='storks', description='')
+        choices = post_forms.PostForm().fields['group'].choices
+        self.assertEqual(
+            [title for pk, title in choices][1], 'Аисты')
+
+
+class GroupAutocompleteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.cats, cls.dogs, cls.cars = create_groups(
+            'Коты', 'Собаки', 'котлеты')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.dogs)
+
+    def setUp(self):
+        cache.clear()
+        self.author = Client()
+        self.author.force_login(self.user)
+
+    def test_prefix_search(self):
+        """Подсказки ищут по началу названия в обоих регистрах."""
+        for prefix, titles in [['кот', ['Коты', 'котлеты']],
+                               ['Соб', ['Собаки']], ['ты', []], ['', []]]:
+            with self.subTest(prefix=prefix):
+                response = self.client.get(URL_AUTOCOMPLETE, {'q': prefix})
+                self.assertEqual(
+                    [group['title'] for group in response.json()['results']],
+                    titles)
+
+    @mock.patch.object(post_forms, 'GROUP_SELECT_AUTOCOMPLETE', True)
+    def test_autocomplete_widget(self):
+        """В режиме подсказок группы не выводятся списком."""
+        response = self.author.get(
+            reverse('posts:post_edit', args=[self.post.pk]))
+        field = response.context['form'].fields['group']
+        self.assertIs(type(field), forms.ModelChoiceField)
+        self.assertNotContains(response, 'Коты')
+        self.assertContains(response, 'value="Собаки"')
+        self.assertContains(response, URL_AUTOCOMPLETE)
+        self.author.post(
+            reverse('posts:post_edit', args=[self.post.pk]),
+            {'text': 'Новый текст', 'group': self.cats.pk})
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).group, self.cats)
@@ -0,0 +1,117 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import identity, view_counts
+from ..models import Group, Post, User
+
+URL_PROFILE = reverse('posts:profile', args=['auth'])
+URL_GROUP = reverse('posts:group_list', args=['test-slug'])
+
+
+# Записи кэшируются только вне транзакции, поэтому тесты идут без
+# обёртки TestCase.
+class IdentityCacheTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        view_counts.buffer.take()
+        self.user = User.objects.create_user(
+            username='auth', first_name='Имя')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group)
+        self.guest = Client()
+
+    def test_found_objects_cached(self):
+        identity.find_user('auth')
+        identity.find_group('test-slug')
+        identity.find_post(self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(identity.find_user('auth'), self.user)
+            self.assertEqual(identity.find_group('test-slug'), self.group)
+            post = identity.find_post(self.post.pk)
+            self.assertEqual(post.author.first_name, 'Имя')
+            self.assertEqual(post.group.title, 'Тестовая группа')
+
+    def test_not_modified_without_queries(self):
+        """Повторный показ профиля и группы с ETag не ходит в базу."""
+        for address in (URL_PROFILE, URL_GROUP):
+            with self.subTest(address=address):
+                etag = self.guest.get(address)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest.get(
+                        address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_missing_cached_until_created(self):
+        """Отсутствие тоже кэшируется, а регистрация его сбрасывает."""
+        self.assertIsNone(identity.find_user('newcomer'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(identity.find_user('newcomer'))
+        user = User.objects.create_user(username='newcomer')
+        self.assertEqual(identity.find_user('newcomer'), user)
+
+    def test_rename_forgets_old_entries(self):
+        """Переименование сбрасывает старое имя и посты автора и группы."""
+        identity.find_user('auth')
+        identity.find_group('test-slug')
+        identity.find_post(self.post.pk)
+        self.user.username = 'renamed'
+        self.user.save()
+        self.group.slug = 'new-slug'
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertIsNone(identity.find_user('auth'))
+        self.assertIsNone(identity.find_group('test-slug'))
+        post = identity.find_post(self.post.pk)
+        self.assertEqual(post.author.username, 'renamed')
+        self.assertEqual(post.group.title, 'Новое название')
+
+    def test_rename_forgets_posts_in_batches(self):
+        """Посты автора сбрасываются пачками, а не одним запросом."""
+        posts = [self.post] + [
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        for post in posts:
+            identity.find_post(post.pk)
+        with mock.patch.object(identity, 'IDENTITY_FORGET_BATCH_SIZE', 2), \
+                mock.patch.object(
+                    cache, 'delete_many', wraps=cache.delete_many) as delete:
+            self.user.first_name = 'Другое'
+            self.user.save()
+        # Пять постов по два ключа — три пачки.
+        self.assertGreaterEqual(delete.call_count, 3)
+        self.assertTrue(all(
+            len(call.args[0]) <= 2 for call in delete.call_args_list))
+        for post in posts:
+            self.assertEqual(
+                identity.find_post(post.pk).author.first_name, 'Другое')
+
+    def test_post_entries_expire_sooner(self):
+        with mock.patch.object(cache, 'set', wraps=cache.set) as store:
+            identity.find_user('auth')
+            identity.find_post(self.post.pk)
+        (_, user_timeout), (_, post_timeout) = (
+            call.args[1:] for call in store.call_args_list)
+        self.assertLess(post_timeout, user_timeout)
+
+    def test_delete_and_views_forget_post(self):
+        identity.find_post(self.post.pk)
+        view_counts.buffer.add(self.post.pk)
+        view_counts.flush()
+        self.assertEqual(identity.find_post(self.post.pk).views, 1)
+        self.post.delete()
+        self.assertIsNone(identity.find_post(self.post.pk))
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_hits_and_misses_logged(self):
+        with self.assertLogs('yatube.timing', 'INFO') as logs:
+            self.guest.get(URL_PROFILE)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['identity_misses'], 1)
+        self.assertEqual(record['identity_hits'], 1)
@@ -0,0 +1,135 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import view_counts
+from ..models import Comment, Follow, Group, GroupFollow, Post, User
+from ..settings import COUNT_POSTS_IN_PAGE
+
+GROUP_SLUG = 'test-slug'
+USERNAME = 'auth'
+USERNAME_2 = 'reader'
+USERNAME_3 = 'other'
+
+URL_MAIN = reverse('posts:index')
+URL_CREATE = reverse('posts:create')
+URL_GROUP = reverse('posts:group_list', args=[GROUP_SLUG])
+URL_PROFILE = reverse('posts:profile', args=[USERNAME])
+URL_FOLLOW = reverse('posts:follow_index')
+URL_TRENDING = reverse('posts:trending')
+URL_SEARCH = reverse('posts:search') + '?q=пост'
+URL_GROUP_FOLLOW = reverse('posts:group_follow', args=[GROUP_SLUG])
+URL_GROUP_UNFOLLOW = reverse('posts:group_unfollow', args=[GROUP_SLUG])
+URL_PROFILE_FOLLOW = reverse('posts:profile_follow', args=[USERNAME])
+URL_PROFILE_UNFOLLOW = reverse('posts:profile_unfollow', args=[USERNAME])
+
+
+class QueryCountTests(TestCase):
+    """Число запросов не зависит от числа постов и коментариев."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username=USERNAME, first_name='Имя', last_name='Фамилия')
+        cls.user_2 = User.objects.create_user(username=USERNAME_2)
+        cls.user_3 = User.objects.create_user(username=USERNAME_3)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user_2, author=cls.user)
+        for i in range(COUNT_POSTS_IN_PAGE + 1):
+            cls.post = Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+        for i in range(COUNT_POSTS_IN_PAGE):
+            Comment.objects.create(
+                post=cls.post, author=cls.user_3, text=f'Коментарий {i}')
+        cls.URL_POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.URL_POST_EDIT = reverse('posts:post_edit', args=[cls.post.pk])
+        cls.URL_ADD_COMMENT = reverse('posts:add_comment', args=[cls.post.pk])
+        cls.URL_COMMENTS = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        # Накопленные другими тестами просмотры не должны записаться
+        # посреди замера.
+        view_counts.buffer.take()
+        self.guest = Client()
+        self.author = Client()
+        self.author.force_login(self.user)
+        self.reader = Client()
+        self.reader.force_login(self.user_2)
+        self.other = Client()
+        self.other.force_login(self.user_3)
+
+    def test_views_query_count(self):
+        """Число запросов каждой страницы зафиксировано."""
+        cases = [
+            [URL_MAIN, self.guest, 'get', 1],
+            [URL_MAIN, self.reader, 'get', 3],
+            [URL_GROUP, self.guest, 'get', 3],
+            [URL_GROUP, self.reader, 'get', 6],
+            [URL_PROFILE, self.guest, 'get', 4],
+            [URL_PROFILE, self.reader, 'get', 7],
+            [self.URL_POST_DETAIL, self.guest, 'get', 4],
+            [self.URL_POST_DETAIL, self.author, 'get', 6],
+            [URL_CREATE, self.author, 'get', 3],
+            [self.URL_POST_EDIT, self.author, 'get', 4],
+            [self.URL_POST_EDIT, self.other, 'get', 3],
+            [URL_FOLLOW, self.reader, 'get', 5],
+            [URL_TRENDING, self.guest, 'get', 2],
+            [URL_SEARCH, self.guest, 'get', 2],
+            [self.URL_COMMENTS, self.guest, 'get', 2],
+            [self.URL_ADD_COMMENT, self.other, 'post', 7],
+            [self.URL_POST_EDIT, self.author, 'post', 7],
+            [URL_CREATE, self.author, 'post', 9],
+            [URL_PROFILE_FOLLOW, self.other, 'get', 14],
+            [URL_PROFILE_UNFOLLOW, self.other, 'get', 9],
+            [URL_GROUP_FOLLOW, self.other, 'get', 7],
+            [URL_GROUP_UNFOLLOW, self.other, 'get', 4],
+        ]
+        for address, client, method, count in cases:
+            with self.subTest(address=address, method=method):
+                cache.clear()
+                data = {'text': 'Текст'} if method == 'post' else {}
+                with self.assertNumQueries(count):
+                    getattr(client, method)(address, data)
+
+    def test_follow_feed_many_groups(self):
+        """Лента подписок читает все группы читателя одним запросом."""
+        groups = [self.group] + [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(29)
+        ]
+        for count in (1, len(groups)):
+            with self.subTest(groups=count):
+                GroupFollow.objects.filter(user=self.user_3).delete()
+                GroupFollow.objects.bulk_create(
+                    GroupFollow(user=self.user_3, group=group)
+                    for group in groups[:count])
+                cache.clear()
+                with self.assertNumQueries(6):
+                    response = self.other.get(URL_FOLLOW)
+                self.assertEqual(
+                    len(response.context['page_obj']), COUNT_POSTS_IN_PAGE)
+
+    def test_cached_feeds_skip_post_queries(self):
+        """Лента из кэша не читает посты."""
+        for address, count in [[URL_MAIN, 0], [URL_GROUP, 2],
+                               [URL_PROFILE, 3]]:
+            with self.subTest(address=address):
+                self.guest.get(address)
+                with self.assertNumQueries(count):
+                    self.guest.get(address)
+
+    def test_not_modified_skips_page(self):
+        """Повторный запрос с ETag получает 304 без запросов страницы."""
+        for address, count in [[URL_MAIN, 0], [URL_GROUP, 1],
+                               [URL_PROFILE, 1], [self.URL_POST_DETAIL, 1]]:
+            with self.subTest(address=address):
+                etag = self.guest.get(address)['ETag']
+                with self.assertNumQueries(count):
+                    response = self.guest.get(
+                        address, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
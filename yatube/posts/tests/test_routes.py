@@ -15,6 +15,7 @@ URLS_PAGES_NAMES = [
     ['post_detail', f'/posts/{POST_ID}/', [POST_ID]],
     ['post_edit', f'/posts/{POST_ID}/edit/', [POST_ID]],
     ['add_comment', f'/posts/{POST_ID}/comment/', [POST_ID]],
+    ['post_comments', f'/posts/{POST_ID}/comments/', [POST_ID]],
     ['follow_index', '/follow/', []],
     ['profile_follow', f'/profile/{USERNAME}/follow/', [USERNAME]],
     ['profile_unfollow', f'/profile/{USERNAME}/unfollow/', [USERNAME]],
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..search import COMMENT_INDEX, POST_INDEX, search_ids, search_posts
+from ..stemmer import stem
+
+USERNAME = 'auth'
+URL_SEARCH = reverse('posts:search')
+URL_ADMIN_POSTS = reverse('admin:posts_post_changelist')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username=USERNAME, email='auth@yatube.ru', password='pass')
+
+    def setUp(self):
+        self.cats = Post.objects.create(
+            author=self.user, text='Наши коты спят на диване')
+        self.dogs = Post.objects.create(
+            author=self.user, text='Собака гуляет во дворе')
+        Comment.objects.create(
+            post=self.dogs, author=self.user, text='А мой кот боится собак')
+
+    def test_stemming(self):
+        """Разные формы слова сводятся к одной основе."""
+        for word in ('кот', 'коты', 'котов', 'котами'):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), 'кот')
+
+    def test_ranked_posts_and_comments(self):
+        """Совпадение в тексте поста ранжируется выше, чем в комментарии."""
+        self.assertEqual(
+            search_posts('котов'), [self.cats.pk, self.dogs.pk])
+        self.assertEqual(search_posts('диваны'), [self.cats.pk])
+        self.assertEqual(search_posts('!!!'), [])
+
+    def test_index_follows_writes(self):
+        """Правка и удаление поста меняют индекс."""
+        self.cats.text = 'Теперь здесь про попугаев'
+        self.cats.save()
+        self.assertEqual(search_ids(POST_INDEX, 'коты'), [])
+        self.assertEqual(search_ids(POST_INDEX, 'попугай'), [self.cats.pk])
+        self.dogs.delete()
+        self.assertEqual(search_ids(POST_INDEX, 'собака'), [])
+        self.assertEqual(search_ids(COMMENT_INDEX, 'собака'), [])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты."""
+        response = self.client.get(URL_SEARCH, {'q': 'коты на диванах'})
+        self.assertEqual(list(response.context['page_obj']), [self.cats])
+
+    def test_admin_search(self):
+        """Поиск в админке идёт через индекс."""
+        self.client.force_login(self.user)
+        response = self.client.get(URL_ADMIN_POSTS, {'q': 'собаки'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dogs])
+
+    def test_reindex_command(self):
+        """Команда восстанавливает индекс с нуля."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POST_INDEX}')
+        call_command('reindex_search', batch_size=1, stdout=StringIO())
+        self.assertEqual(search_ids(POST_INDEX, 'собаки'), [self.dogs.pk])
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+
+USERNAME = 'auth'
+USERNAME_2 = 'reader'
+URL_PROFILE = reverse('posts:profile', args=[USERNAME])
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.user_2 = User.objects.create_user(username=USERNAME_2)
+
+    def setUp(self):
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        Post.objects.create(author=self.user, text='Ещё пост')
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Коментарий')
+        Follow.objects.create(user=self.user_2, author=self.user)
+
+    def assertStats(self, user, **expected):
+        stats = UserStats.objects.get(user=user)
+        for counter, value in expected.items():
+            with self.subTest(user=user, counter=counter):
+                self.assertEqual(getattr(stats, counter), value)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        self.assertStats(
+            self.user, posts_count=2, comments_count=1,
+            followers_count=1, following_count=0)
+        self.assertStats(self.user_2, following_count=1)
+        self.post.delete()
+        Follow.objects.all().delete()
+        self.assertStats(
+            self.user, posts_count=1, comments_count=0, followers_count=0)
+        self.assertStats(self.user_2, following_count=0)
+
+    def test_rebuild_command(self):
+        """Команда пересчитывает счётчики с нуля."""
+        UserStats.objects.all().delete()
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertStats(
+            self.user, posts_count=2, comments_count=1,
+            followers_count=1, following_count=0)
+        self.assertStats(self.user_2, following_count=1)
+
+    def test_profile_without_aggregates(self):
+        """Профиль берёт счётчики из статистики."""
+        response = self.client.get(URL_PROFILE)
+        self.assertEqual(response.context['stats'].posts_count, 2)
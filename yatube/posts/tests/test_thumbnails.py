@@ -0,0 +1,161 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .const import SMALL_GIF
+from ..fragments import post_html_keys, render_posts
+from ..images import generate_variants, get_picture
+from ..models import ImageVariant, Post, User
+from ..settings import IMAGE_VARIANTS, THUMBNAIL_GEOMETRIES
+from ..thumbnails import generate_thumbnails, is_pending, resolve_thumbnails
+
+USERNAME = 'auth'
+URL_MAIN = reverse('posts:index')
+URL_CREATE = reverse('posts:create')
+URL_DETAIL = 'posts:post_detail'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPregenerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author.post(URL_CREATE, {
+            'text': 'Пост с картинкой',
+            'image': SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF,
+                content_type='image/gif'),
+        })
+        self.post = Post.objects.get()
+
+    def test_pending_thumbnail_falls_back(self):
+        """Пока миниатюра в очереди, лента показывает оригинал."""
+        self.assertTrue(is_pending(self.post))
+        self.assertContains(
+            self.client.get(URL_MAIN), self.post.image.url)
+
+    def test_generate_thumbnails(self):
+        """Задача создаёт все миниатюры и снимает отметку об очереди."""
+        generate_thumbnails(self.post.image.name, [('index',)])
+        self.assertFalse(is_pending(self.post))
+        source = ImageFile(self.post.image)
+        thumbnails = default.kvstore._get(source.key, identity='thumbnails')
+        self.assertEqual(len(thumbnails), len(THUMBNAIL_GEOMETRIES))
+        self.assertNotContains(
+            self.client.get(URL_MAIN), self.post.image.url)
+
+    def test_resolve_page_in_one_batch(self):
+        """Миниатюры страницы читаются одним запросом, затем из кэша."""
+        for i in range(3):
+            Post.objects.create(
+                author=self.user, text=f'Пост {i}', image=self.post.image)
+        generate_thumbnails(self.post.image.name, [])
+        posts = list(Post.objects.all())
+        cache.clear()
+        with self.assertNumQueries(1):
+            resolve_thumbnails(posts, 'feed')
+        with self.assertNumQueries(0):
+            resolve_thumbnails(posts, 'feed')
+        urls = {post.thumbnail_url for post in posts}
+        self.assertEqual(len(urls), 1)
+        self.assertIsNotNone(urls.pop())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(buffer, 'JPEG')
+        self.post = Post.objects.create(
+            author=self.user, text='Пост с фото',
+            image=SimpleUploadedFile('photo.jpg', buffer.getvalue()))
+
+    def test_variants_generated_once(self):
+        """Версии считаются один раз на файл, по всем ширинам."""
+        generate_variants(self.post.pk)
+        variants = ImageVariant.objects.filter(
+            post=self.post, mime_type='image/jpeg')
+        self.assertEqual(
+            variants.count(),
+            sum(len(kind['widths']) for kind in IMAGE_VARIANTS.values()))
+        ids = set(variants.values_list('pk', flat=True))
+        generate_variants(self.post.pk)
+        self.assertEqual(
+            set(ImageVariant.objects.filter(
+                post=self.post, mime_type='image/jpeg').values_list(
+                    'pk', flat=True)), ids)
+
+    def test_picture_srcset(self):
+        """Страница поста отдаёт srcset из готовых версий."""
+        generate_variants(self.post.pk)
+        picture = get_picture(
+            Post.objects.for_detail().get(pk=self.post.pk), 'detail')
+        for width in IMAGE_VARIANTS['detail']['widths']:
+            self.assertIn(f'{width}w', picture.srcset)
+        response = self.client.get(
+            reverse(URL_DETAIL, args=(self.post.pk,)))
+        self.assertContains(response, picture.srcset)
+
+    def test_fragment_keyed_by_variants(self):
+        """Фрагмент без версий кэшируется отдельно и ненадолго."""
+        def render():
+            return ''.join(render_posts(Post.objects.for_feed()))
+
+        post = Post.objects.for_feed().get()
+        ready, fallback = post_html_keys(post, 'feed', False)
+        render()
+        self.assertEqual(list(cache.get_many([ready, fallback])), [fallback])
+        with mock.patch('posts.fragments.get_template') as get_template:
+            render()
+        get_template.assert_not_called()
+        generate_variants(post.pk)
+        # Запасной фрагмент истёк.
+        cache.delete(fallback)
+        self.assertIn('srcset', render())
+        self.assertIn(ready, cache.get_many([ready]))
+
+    def test_generate_missing_variants_command(self):
+        """Команда считает версии только там, где их нет."""
+        other = Post.objects.create(
+            author=self.user, text='Ещё пост', image=self.post.image)
+        Post.objects.create(author=self.user, text='Без картинки')
+        generate_variants(other.pk)
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('Обработано постов: 1', out.getvalue())
+        self.assertTrue(ImageVariant.objects.filter(
+            post=self.post, source=self.post.image.name).exists())
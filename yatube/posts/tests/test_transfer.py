@@ -0,0 +1,131 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .const import SMALL_GIF
+from ..models import (
+    Comment, Follow, Group, GroupFollow, Post, TimelineEntry, TrendingScore,
+    User, UserStats
+)
+from ..search import POST_INDEX, search_ids
+from ..transfer import Importer, open_stream
+
+USERNAME = 'auth'
+USERNAME_2 = 'reader'
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username=USERNAME)
+        self.reader = User.objects.create_user(username=USERNAME_2)
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Коты и собаки',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF))
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Коментарий')
+        Follow.objects.create(user=self.reader, author=self.user)
+        GroupFollow.objects.create(user=self.reader, group=self.group)
+        self.path = os.path.join(self.directory, 'dump.jsonl.gz')
+
+    def export_and_wipe(self):
+        call_command('export_jsonl', self.path, stdout=StringIO())
+        pub_date = self.post.pub_date
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.filter(username=USERNAME_2).delete()
+        return pub_date
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные и производные."""
+        pub_date = self.export_and_wipe()
+        for _ in range(2):
+            call_command(
+                'import_jsonl', self.path, batch_size=1, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.group.slug, self.group.slug)
+        self.assertEqual(post.image.name, self.post.image.name)
+        self.assertEqual(Comment.objects.get().author.username, USERNAME_2)
+        reader = User.objects.get(username=USERNAME_2)
+        self.assertTrue(Follow.objects.filter(
+            user=reader, author=self.user).exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=reader, post=post).exists())
+        self.assertTrue(GroupFollow.objects.filter(
+            user=reader, group=post.group).exists())
+        self.assertTrue(TrendingScore.objects.filter(post=post).exists())
+        self.assertEqual(search_ids(POST_INDEX, 'кот'), [post.pk])
+        self.assertEqual(UserStats.objects.get(user=reader).comments_count, 1)
+
+    def test_import_into_populated_database(self):
+        """Занятый чужой строкой pk не отдаёт ей комментарии файла."""
+        comment_id = Comment.objects.get().pk
+        pub_date = self.export_and_wipe()
+        other = Post.objects.create(
+            pk=self.post.pk, author=self.user, text='Чужой пост')
+        Comment.objects.create(
+            pk=comment_id, post=other, author=self.user, text='Чужой')
+        out = StringIO()
+        for _ in range(2):
+            call_command(
+                'import_jsonl', self.path, batch_size=1, stdout=out)
+        self.assertIn('remapped_posts: 1', out.getvalue())
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, 'Чужой пост')
+        post = Post.objects.get(text='Коты и собаки')
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        comment = Comment.objects.get(text='Коментарий')
+        self.assertEqual(comment.post, post)
+        self.assertEqual(
+            Comment.objects.get(text='Чужой').post_id, self.post.pk)
+        self.assertEqual(search_ids(POST_INDEX, 'кот'), [post.pk])
+        self.assertTrue(TrendingScore.objects.filter(post=post).exists())
+
+    def test_importer_forgets_batches(self):
+        """После каждой пачки импортёр не держит её id."""
+        self.export_and_wipe()
+        importer = Importer(batch_size=1)
+        with open_stream(self.path, 'r') as stream:
+            importer.run(stream)
+        self.assertEqual(
+            (importer.group_ids, importer.user_ids, importer.post_ids),
+            ({}, set(), set()))
+        self.assertTrue(TrendingScore.objects.filter(
+            post_id=self.post.pk).exists())
+        self.assertEqual(UserStats.objects.get(
+            user__username=USERNAME_2).comments_count, 1)
+
+    def test_missing_image(self):
+        """Ссылка на пропавший файл картинки сбрасывается."""
+        self.export_and_wipe()
+        os.remove(os.path.join(TEMP_MEDIA_ROOT, self.post.image.name))
+        out = StringIO()
+        call_command('import_jsonl', self.path, stdout=out)
+        self.assertEqual(Post.objects.get().image.name, '')
+        self.assertIn('missing_images: 1', out.getvalue())
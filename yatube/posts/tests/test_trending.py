@@ -0,0 +1,99 @@
+import math
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import trending, view_counts
+from ..models import Comment, Follow, Post, TrendingScore, User
+from ..settings import COUNT_POSTS_IN_PAGE, TRENDING_HALF_LIFE
+
+URL_TRENDING = reverse('posts:trending')
+
+
+def page_texts(response):
+    return [post.text for post in response.context['page_obj']]
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old = Post.objects.create(author=cls.user, text='Старый пост')
+        cls.new = Post.objects.create(author=cls.user, text='Новый пост')
+
+    def setUp(self):
+        cache.clear()
+        view_counts.buffer.take()
+        self.guest = Client()
+
+    def score(self, post):
+        return TrendingScore.objects.get(post=post).score
+
+    def test_decay(self):
+        """Событие через период полураспада весит вдвое больше."""
+        now = self.new.pub_date
+        self.assertAlmostEqual(
+            trending.event_score(
+                'comment', now + timedelta(seconds=TRENDING_HALF_LIFE))
+            - trending.event_score('comment', now),
+            math.log(2))
+
+    def test_new_post_first(self):
+        self.assertEqual(
+            page_texts(self.guest.get(URL_TRENDING)),
+            ['Новый пост', 'Старый пост'])
+
+    def test_comment_raises_post(self):
+        """Комментарий складывается с рейтингом поста в базе."""
+        before = self.score(self.old)
+        comment = Comment.objects.create(
+            post=self.old, author=self.reader, text='Коментарий')
+        self.assertAlmostEqual(
+            self.score(self.old),
+            trending.logaddexp(
+                before, trending.event_score('comment', comment.created)))
+        self.assertEqual(
+            page_texts(self.guest.get(URL_TRENDING)),
+            ['Старый пост', 'Новый пост'])
+
+    def test_follow_and_views_raise_posts(self):
+        scores = [self.score(post) for post in (self.old, self.new)]
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertTrue(self.score(self.old) > scores[0])
+        self.assertTrue(self.score(self.new) > scores[1])
+        scores = self.score(self.old)
+        self.guest.get(reverse('posts:post_detail', args=[self.old.pk]))
+        view_counts.flush()
+        self.assertTrue(self.score(self.old) > scores)
+
+    def test_rebuild(self):
+        Comment.objects.create(
+            post=self.old, author=self.reader, text='Коментарий')
+        scores = dict(TrendingScore.objects.values_list('post', 'score'))
+        TrendingScore.objects.all().delete()
+        call_command('rebuild_trending', stdout=StringIO())
+        for post, score in TrendingScore.objects.values_list(
+                'post', 'score'):
+            self.assertAlmostEqual(score, scores[post])
+
+    def test_pages(self):
+        """Лента листается так же, как главная."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(COUNT_POSTS_IN_PAGE))
+        trending.rebuild(Post.objects.values_list('pk', flat=True))
+        first = self.guest.get(URL_TRENDING)
+        page_obj = first.context['page_obj']
+        self.assertEqual(len(page_obj), COUNT_POSTS_IN_PAGE)
+        second = self.guest.get(
+            URL_TRENDING, {'after': page_obj.paginator.next_cursor})
+        self.assertEqual(len(second.context['page_obj']), 2)
+        self.assertEqual(
+            len(self.guest.get(URL_TRENDING, {'page': 2}).context[
+                'page_obj']), 2)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from .. import view_counts
+from ..models import Post, User
+
+
+class ViewCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.URL_POST_DETAIL = reverse(
+            'posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+        view_counts.buffer.take()
+        self.guest = Client()
+
+    def views_in_db(self):
+        return Post.objects.values_list(
+            'views', flat=True).get(pk=self.post.pk)
+
+    def test_views_buffered_until_flush(self):
+        """Просмотры видны сразу, а в базу пишутся одной пачкой."""
+        for _ in range(3):
+            response = self.guest.get(self.URL_POST_DETAIL)
+        self.assertEqual(response.context['views'], 2)
+        self.assertEqual(self.views_in_db(), 0)
+        edited = Post.objects.get(pk=self.post.pk).edited
+        with self.assertNumQueries(4):
+            self.assertEqual(
+                view_counts.flush(), {self.post.pk: 3})
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.views, 3)
+        self.assertEqual(post.edited, edited)
+
+    def test_not_modified_counted(self):
+        """Ответ 304 тоже считается просмотром."""
+        etag = self.guest.get(self.URL_POST_DETAIL)['ETag']
+        response = self.guest.get(
+            self.URL_POST_DETAIL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(view_counts.buffer.get(self.post.pk), 2)
+
+    def test_flush_on_threshold(self):
+        """Пачка пишется сама, когда набралось VIEWS_FLUSH_THRESHOLD."""
+        with mock.patch.object(view_counts, 'VIEWS_FLUSH_THRESHOLD', 2):
+            self.guest.get(self.URL_POST_DETAIL)
+            self.assertEqual(self.views_in_db(), 0)
+            self.guest.get(self.URL_POST_DETAIL)
+        self.assertEqual(self.views_in_db(), 2)
+        self.assertEqual(view_counts.buffer.get(self.post.pk), 0)
+
+    def test_missing_post_not_counted(self):
+        self.guest.get(reverse('posts:post_detail', args=[0]))
+        self.assertEqual(view_counts.buffer.get(0), 0)
+
+
+# Таймер пишет из своего потока, который видит только закоммиченное.
+class ViewFlushTimerTests(TransactionTestCase):
+    def test_timer_flushes_without_new_views(self):
+        """Пачка пишется по таймеру, даже если просмотров больше нет."""
+        user = User.objects.create_user(username='auth')
+        post = Post.objects.create(author=user, text='Тестовый пост')
+        buffer = view_counts.ViewBuffer()
+        with mock.patch.object(view_counts, 'VIEWS_FLUSH_INTERVAL', 0.01):
+            buffer.add(post.pk)
+            timer = buffer.timer
+            timer.join(5)
+        self.assertEqual(
+            Post.objects.values_list('views', flat=True).get(pk=post.pk), 1)
+        self.assertEqual(buffer.get(post.pk), 0)
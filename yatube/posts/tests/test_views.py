@@ -1,14 +1,23 @@
 import shutil
 import tempfile
+from unittest import mock
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from .const import SMALL_GIF
-from ..models import Post, Group, User, Follow
-from ..settings import COUNT_POSTS_IN_PAGE
+from ..models import Comment, Post, Group, User, Follow, TimelineEntry
+from .. import timeline
+from ..fragments import render_posts
+from ..paginators import CursorPaginator, decode_cursor, encode_cursor
+from ..settings import COUNT_COMMENTS_IN_PAGE, COUNT_POSTS_IN_PAGE
+from ..timeline import (
+    FEED_KEY, FEED_PK, get_follow_sources, get_pull_authors, resume_fan_out
+)
 
 GROUP_SLUG = 'test-slug'
 GROUP_SLUG_2 = 'group-2'
@@ -25,6 +34,13 @@ URL_PROFILE_FOLLOW = reverse('posts:profile_follow', args=[USERNAME])
 URL_PROFILE_UNFOLLOW = reverse('posts:profile_unfollow', args=[USERNAME])
 
 
+def query_plan(objects):
+    sql, params = objects.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return ' '.join(row[-1] for row in cursor.fetchall())
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PagesTests(TestCase):
     @classmethod
@@ -129,12 +145,14 @@ class PagesTests(TestCase):
                 author=self.user).exists())
 
     def test_follow_correct(self):
-        """Подписка."""
-        self.follower.get(URL_PROFILE_FOLLOW)
-        self.assertTrue(
+        """Подписка, повторная ничего не меняет."""
+        for _ in range(2):
+            response = self.follower.get(URL_PROFILE_FOLLOW)
+            self.assertRedirects(response, URL_PROFILE)
+        self.assertEqual(
             Follow.objects.filter(
                 user=self.user_2,
-                author=self.user).exists())
+                author=self.user).count(), 1)
 
 
 class PaginatorViewsTest(TestCase):
@@ -171,3 +189,336 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     count_posts
                 )
+
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно."""
+        for address in [URL_MAIN, URL_GROUP, URL_PROFILE]:
+            with self.subTest(address=address):
+                first = self.guest_client.get(address).context['page_obj']
+                self.assertEqual(len(first), COUNT_POSTS_IN_PAGE)
+                response = self.guest_client.get(
+                    address, {'after': first.paginator.next_cursor})
+                second = response.context['page_obj']
+                self.assertEqual(len(second), self.count_posts_in_2_page)
+                self.assertFalse(second.has_next())
+                self.assertFalse(set(first) & set(second))
+                response = self.guest_client.get(
+                    address, {'before': second.paginator.previous_cursor})
+                self.assertEqual(
+                    list(response.context['page_obj']), list(first))
+                self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_broken_cursor(self):
+        """Битый курсор открывает первую страницу."""
+        for cursor in ['broken', encode_cursor(None, 1),
+                       encode_cursor('2020-01-01T00:00:00+00:00', 10 ** 20)]:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(URL_MAIN, {'after': cursor})
+                self.assertEqual(
+                    len(response.context['page_obj']), COUNT_POSTS_IN_PAGE)
+
+    def test_cursor_uses_index_range(self):
+        """Страница после курсора — поиск по индексу, а не его обход."""
+        first = self.guest_client.get(URL_MAIN).context['page_obj']
+        posts = Post.objects.for_feed()
+        paginator = CursorPaginator(posts, COUNT_POSTS_IN_PAGE)
+        paginator.cursor = decode_cursor(
+            first.paginator.next_cursor, Post._meta.get_field('pub_date'))
+        plan = query_plan(paginator._filter(posts, 'lt').order_by(
+            '-pub_date', '-id'))
+        self.assertIn('SEARCH', plan)
+        self.assertIn('pub_date<', plan)
+
+
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.count_comments_in_2_page = 5
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Коментарий {i}')
+            for i in range(
+                COUNT_COMMENTS_IN_PAGE + cls.count_comments_in_2_page)
+        )
+        cls.URL_POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.URL_COMMENTS = reverse('posts:post_comments', args=[cls.post.pk])
+
+    def test_comment_pages(self):
+        """Первая страница комментариев на месте, следующая — фрагментом."""
+        first = self.client.get(self.URL_POST_DETAIL).context['comments']
+        self.assertEqual(len(first), COUNT_COMMENTS_IN_PAGE)
+        self.assertTrue(first.has_next())
+        response = self.client.get(
+            self.URL_COMMENTS, {'after': first.paginator.next_cursor})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        second = response.context['comments']
+        self.assertEqual(len(second), self.count_comments_in_2_page)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+
+    def test_comments_of_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 1]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.URL_POST_DETAIL = reverse('posts:post_detail', args=[cls.post.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_validators_change_with_data(self):
+        """Новый комментарий или пост меняет ETag страниц."""
+        for address, change in [
+            [self.URL_POST_DETAIL, lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Коментарий')],
+            [URL_MAIN, lambda: Post.objects.create(
+                author=self.user, text='Новый пост')],
+            [URL_PROFILE, lambda: Follow.objects.create(
+                user=User.objects.create_user(username=USERNAME_2),
+                author=self.user)],
+        ]:
+            with self.subTest(address=address):
+                response = self.client.get(address)
+                self.assertTrue(response.has_header('Last-Modified'))
+                etag = response['ETag']
+                self.assertEqual(self.client.get(
+                    address, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+                change()
+                self.assertEqual(self.client.get(
+                    address, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag."""
+        etag = self.client.get(self.URL_POST_DETAIL)['ETag']
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(
+            self.URL_POST_DETAIL, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа - 2',
+            slug=GROUP_SLUG_2,
+            description='Второе естовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_fresh_after_write(self):
+        """Закэшированные ленты обновляются сразу после записи."""
+        urls = [URL_MAIN, URL_GROUP, URL_PROFILE]
+        for address in urls:
+            self.client.get(address)
+        new_post = Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group)
+        for address in urls:
+            with self.subTest(address=address):
+                self.assertContains(self.client.get(address), new_post.text)
+
+    def test_group_change_moves_post(self):
+        """Смена группы обновляет ленты обеих групп."""
+        self.client.get(URL_GROUP)
+        self.client.get(URL_GROUP_2)
+        self.post.group = self.group_2
+        self.post.save()
+        self.assertNotContains(self.client.get(URL_GROUP), self.post.text)
+        self.assertContains(self.client.get(URL_GROUP_2), self.post.text)
+
+    def test_post_fragments(self):
+        """HTML поста берётся из кэша, пока пост, автор и группа те же."""
+        def render():
+            return ''.join(render_posts(Post.objects.for_feed()))
+
+        render()
+        with mock.patch('posts.fragments.get_template') as get_template:
+            render()
+        get_template.assert_not_called()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Правленый текст'
+        changes = [
+            ('Правленый текст', post.save),
+            ('Новое имя', lambda: User.objects.filter(
+                pk=self.user.pk).update(first_name='Новое имя')),
+            ('Новое название', lambda: Group.objects.filter(
+                pk=self.group.pk).update(title='Новое название')),
+        ]
+        for text, change in changes:
+            with self.subTest(text=text):
+                change()
+                self.assertIn(text, render())
+
+
+class FollowTimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.user_2 = User.objects.create_user(username=USERNAME_2)
+        cls.follower = Client()
+        cls.follower.force_login(cls.user_2)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(self.follower.get(URL_FOLLOW).context['page_obj'])
+
+    def test_timeline_fan_out_and_trim(self):
+        """Пост раскладывается по ленте, отписка чистит ленту."""
+        old_post = Post.objects.create(author=self.user, text='Старый пост')
+        self.follower.get(URL_PROFILE_FOLLOW)
+        new_post = Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.user_2).values_list('post', flat=True)),
+            {old_post.pk, new_post.pk})
+        self.assertEqual(self.feed(), [new_post, old_post])
+        self.follower.get(URL_PROFILE_UNFOLLOW)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user_2))
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1)
+    def test_timeline_pull_popular_author(self):
+        """Посты популярного автора читаются напрямую."""
+        self.follower.get(URL_PROFILE_FOLLOW)
+        post = Post.objects.create(author=self.user, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user_2))
+        self.assertEqual(self.feed(), [post])
+
+    def test_timeline_pages_by_index(self):
+        """Страница ленты — диапазон индекса записей без сортировки."""
+        self.follower.get(URL_PROFILE_FOLLOW)
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+            for i in range(COUNT_POSTS_IN_PAGE + 2)
+        ][::-1]
+        first = self.follower.get(URL_FOLLOW).context['page_obj']
+        self.assertEqual(list(first), posts[:COUNT_POSTS_IN_PAGE])
+        second = self.follower.get(
+            f'{URL_FOLLOW}?after={first.paginator.next_cursor}')
+        self.assertEqual(
+            list(second.context['page_obj']), posts[COUNT_POSTS_IN_PAGE:])
+        timeline = get_follow_sources(self.user_2)[0]
+        paginator = CursorPaginator(
+            timeline, COUNT_POSTS_IN_PAGE, FEED_KEY, FEED_PK)
+        paginator.cursor = decode_cursor(
+            first.paginator.next_cursor,
+            TimelineEntry._meta.get_field('pub_date'))
+        plan = query_plan(paginator._filter(timeline, 'lt').order_by(
+            f'-{FEED_KEY}', f'-{FEED_PK}'))
+        self.assertIn('timeline_user_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 2)
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_RESUME', 2)
+    def test_timeline_resume_fan_out(self):
+        """Автор возвращается к раскладке вне запроса отписки."""
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(author=self.user, text='Пост')
+        follow = Follow.objects.create(user=reader, author=self.user)
+        Follow.objects.create(user=self.user_2, author=self.user)
+        self.assertIn(self.user.pk, get_pull_authors())
+        follow.delete()
+        self.assertIn(self.user.pk, get_pull_authors())
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user_2))
+        resume_fan_out(self.user.pk)
+        self.assertNotIn(self.user.pk, get_pull_authors())
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.user_2).values_list(
+                'post', 'pub_date')),
+            [(post.pk, post.pub_date)])
+        self.assertEqual(self.feed(), [post])
+
+    @mock.patch('posts.timeline.TIMELINE_FANOUT_LIMIT', 1)
+    def test_pull_authors_keep_concurrent_change(self):
+        """Переход порога не затирает изменение другого процесса."""
+        other = User.objects.create_user(username='other')
+        get_followers = timeline.follow_graph.get_followers
+
+        def change_between(author_id):
+            # Другой процесс меняет множество, пока этот считает подписчиков.
+            timeline._change_pull_authors(added=[other.pk])
+            return get_followers(author_id)
+
+        with mock.patch.object(
+                timeline.follow_graph, 'get_followers', change_between):
+            self.follower.get(URL_PROFILE_FOLLOW)
+        self.assertEqual(get_pull_authors(), {self.user.pk, other.pk})
+
+
+class GroupFollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.user_2 = User.objects.create_user(username=USERNAME_2)
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug=GROUP_SLUG, description='Описание')
+        cls.group_2 = Group.objects.create(
+            title='Вторая группа', slug=GROUP_SLUG_2, description='Описание')
+        cls.follower = Client()
+        cls.follower.force_login(cls.user_2)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_group_follow_and_unfollow(self):
+        self.follower.get(reverse('posts:group_follow', args=[GROUP_SLUG]))
+        self.assertTrue(self.follower.get(URL_GROUP).context['following'])
+        self.follower.get(reverse('posts:group_unfollow', args=[GROUP_SLUG]))
+        self.assertFalse(self.follower.get(URL_GROUP).context['following'])
+
+    def test_merged_feed(self):
+        """Посты авторов и групп сливаются по дате без повторов."""
+        self.follower.get(URL_PROFILE_FOLLOW)
+        for slug in (GROUP_SLUG, GROUP_SLUG_2):
+            self.follower.get(reverse('posts:group_follow', args=[slug]))
+        other = User.objects.create_user(username='other')
+        groups = [self.group, self.group_2, None]
+        posts = [
+            # Пост подписанного автора в подписанной группе попадает в
+            # ленту из двух источников.
+            Post.objects.create(
+                author=self.user if i % 2 else other, text=f'Пост {i}',
+                group=groups[i % 3])
+            for i in range(COUNT_POSTS_IN_PAGE + 5)
+        ]
+        Post.objects.create(author=other, text='Чужой пост')
+        expected = [
+            post for post in posts[::-1]
+            if post.author == self.user or post.group
+        ]
+        first = self.follower.get(URL_FOLLOW).context['page_obj']
+        self.assertEqual(list(first), expected[:COUNT_POSTS_IN_PAGE])
+        second = self.follower.get(
+            URL_FOLLOW, {'after': first.paginator.next_cursor}).context[
+                'page_obj']
+        self.assertEqual(list(second), expected[COUNT_POSTS_IN_PAGE:])
+        back = self.follower.get(
+            URL_FOLLOW, {'before': second.paginator.previous_cursor}).context[
+                'page_obj']
+        self.assertEqual(list(back), expected[:COUNT_POSTS_IN_PAGE])
+        numbered = self.follower.get(URL_FOLLOW, {'page': 2}).context[
+            'page_obj']
+        self.assertEqual(list(numbered), expected[COUNT_POSTS_IN_PAGE:])
@@ -0,0 +1,137 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.core.cache import cache
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore
+
+from .caching import bump_generations
+from .images import generate_variants
+from .settings import (
+    THUMBNAIL_GEOMETRIES, THUMBNAIL_PENDING_TIMEOUT, THUMBNAIL_WORKERS
+)
+
+PENDING_KEY = 'thumbnails:pending:{}'
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # spawn, а не fork: рабочий процесс не должен наследовать
+        # соединения с базой и кэшем из потока запроса.
+        _executor = ProcessPoolExecutor(
+            max_workers=THUMBNAIL_WORKERS,
+            mp_context=get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def generate_thumbnails(name, scopes, post_pk=None):
+    try:
+        for geometry, options in THUMBNAIL_GEOMETRIES.values():
+            get_thumbnail(name, geometry, **options)
+        if post_pk is not None:
+            generate_variants(post_pk)
+    finally:
+        cache.delete(PENDING_KEY.format(name))
+        # Ленты, закэшированные с запасной картинкой, перерисуются.
+        bump_generations(*scopes)
+
+
+def _submit(name, scopes, post_pk):
+    global _executor
+    try:
+        get_executor().submit(generate_thumbnails, name, scopes, post_pk)
+    except RuntimeError:
+        # Пул сломан или остановлен: миниатюры создаст шаблон при показе.
+        logger.exception('Не удалось поставить миниатюры %s в очередь', name)
+        _executor = None
+        cache.delete(PENDING_KEY.format(name))
+
+
+def enqueue_thumbnails(post):
+    if not post.image:
+        return
+    name = post.image.name
+    scopes = [('index',), ('profile', post.author_id), ('post', post.pk)]
+    if post.group_id:
+        scopes.append(('group', post.group_id))
+    cache.set(PENDING_KEY.format(name), True, THUMBNAIL_PENDING_TIMEOUT)
+    transaction.on_commit(lambda: _submit(name, scopes, post.pk))
+
+
+def is_pending(post):
+    if not post.image:
+        return False
+    if hasattr(post, 'thumbnail_pending'):
+        return post.thumbnail_pending
+    return cache.get(PENDING_KEY.format(post.image.name), False)
+
+
+def thumbnail_name(source, geometry, options):
+    """Имя файла миниатюры, которое посчитал бы get_thumbnail из sorl."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def resolve_thumbnails(posts, kind):
+    """Проставляет постам thumbnail_url одним обращением к кэшу.
+
+    Отметки об очереди и записи хранилища sorl (THUMBNAIL_CACHE по
+    умолчанию тот же кэш) читаются одним get_many, промахи добираются
+    одним запросом к таблице хранилища. Посты без готовой миниатюры
+    остаются с thumbnail_url = None и показываются тегом thumbnail.
+    """
+    geometry, options = THUMBNAIL_GEOMETRIES[kind]
+    keys = {}
+    for post in posts:
+        post.thumbnail_url = None
+        post.thumbnail_pending = False
+        if post.image:
+            source = ImageFile(post.image)
+            thumbnail = ImageFile(
+                thumbnail_name(source, geometry, options), default.storage)
+            keys[post] = (
+                PENDING_KEY.format(post.image.name), add_prefix(thumbnail.key))
+    if not keys:
+        return
+    values = {
+        key: value for key, value in cache.get_many(
+            [key for pair in keys.values() for key in pair]).items()
+        if value != EMPTY_VALUE
+    }
+    missing = [
+        key for _, key in keys.values() if key not in values
+    ]
+    if missing:
+        rows = dict(KVStore.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        # Как и sorl, запоминаем промахи, чтобы не ходить в базу снова.
+        cache.set_many(
+            {key: rows.get(key, EMPTY_VALUE) for key in missing},
+            sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(rows)
+    for post, (pending_key, key) in keys.items():
+        post.thumbnail_pending = pending_key in values
+        if key in values and not post.thumbnail_pending:
+            post.thumbnail_url = deserialize_image_file(values[key]).url
@@ -0,0 +1,270 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import follow_graph
+from .models import Follow, GroupFollow, Post, TimelineEntry
+from .settings import (
+    TIMELINE_BACKFILL_POSTS, TIMELINE_BATCH_SIZE, TIMELINE_FANOUT_LIMIT,
+    TIMELINE_FANOUT_RESUME, TIMELINE_LOCK_TIMEOUT
+)
+
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_LOCK = 'timeline:pull_authors:lock'
+# Ключ и pk курсора ленты подписок: у записей ленты это её собственные
+# столбцы, у постов — pub_date и id.
+FEED_KEY = 'feed_date'
+FEED_PK = 'feed_pk'
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def get_pull_authors():
+    """Авторы, чьи посты не раскладываются по лентам, а читаются напрямую."""
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        # Между порогами автор мог остаться в чтении напрямую, а чтение
+        # напрямую верно всегда, поэтому после промаха считаем по нижнему.
+        authors = set(
+            Follow.objects.values('author').annotate(
+                followers=Count('id')).filter(
+                    followers__gte=TIMELINE_FANOUT_RESUME).values_list(
+                        'author', flat=True))
+        # add, а не set: множество, которое за это время изменили под
+        # блокировкой, не затирается посчитанным раньше.
+        if not cache.add(PULL_AUTHORS_KEY, authors, None):
+            authors = cache.get(PULL_AUTHORS_KEY, authors)
+    return authors
+
+
+@contextmanager
+def _pull_authors_lock():
+    # add атомарен и между процессами: ключ добавляет только один.
+    while not cache.add(PULL_AUTHORS_LOCK, True, TIMELINE_LOCK_TIMEOUT):
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        cache.delete(PULL_AUTHORS_LOCK)
+
+
+def _change_pull_authors(added=(), removed=()):
+    """Меняет множество под блокировкой, перечитав его.
+
+    Запись целиком прочитанной раньше копии потеряла бы изменение
+    другого процесса: автор, перешедший порог, вернулся бы к раскладке,
+    а новый подписчик, которому его посты не разложили, их бы не увидел.
+    """
+    with _pull_authors_lock():
+        authors = get_pull_authors()
+        cache.set(
+            PULL_AUTHORS_KEY, (authors | set(added)) - set(removed), None)
+
+
+def _add_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def _backfill(user_ids, author_id, since=None):
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gte=since)
+    posts = posts.values_list('pk', 'pub_date')[:TIMELINE_BACKFILL_POSTS]
+    _add_entries(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date)
+        for post_id, pub_date in posts
+        for user_id in user_ids
+    )
+
+
+def fan_out_post(post):
+    if post.author_id in get_pull_authors():
+        return
+    _add_entries(
+        TimelineEntry(
+            user_id=user_id, post=post, author_id=post.author_id,
+            pub_date=post.pub_date)
+        for user_id in follow_graph.get_followers(post.author_id)
+    )
+
+
+def fan_out_posts(posts):
+    """fan_out_post для строк (pk, author_id, pub_date) без сигналов."""
+    pull_authors = get_pull_authors()
+    authors = {author_id for _, author_id, _ in posts} - pull_authors
+    followers = follow_graph.get_many('followers', authors)
+    _add_entries(
+        TimelineEntry(
+            user_id=user_id, post_id=post_id, author_id=author_id,
+            pub_date=pub_date)
+        for post_id, author_id, pub_date in posts
+        if author_id in followers
+        for user_id in followers[author_id]
+    )
+
+
+def add_follows(follows):
+    """add_follow для пачки подписок, загруженных без сигналов."""
+    pull_authors = get_pull_authors()
+    readers = defaultdict(list)
+    for follow in follows:
+        readers[follow.author_id].append(follow.user_id)
+    follow_graph.forget(follows)
+    popular = {
+        author_id
+        for author_id, followers in follow_graph.get_many(
+            'followers', readers).items()
+        if len(followers) >= TIMELINE_FANOUT_LIMIT
+    }
+    if popular - pull_authors:
+        pull_authors = pull_authors | popular
+        _change_pull_authors(added=popular)
+    for author_id, user_ids in readers.items():
+        if author_id not in pull_authors:
+            _backfill(user_ids, author_id)
+
+
+def add_follow(follow):
+    pull_authors = get_pull_authors()
+    if follow.author_id in pull_authors:
+        return
+    # Граф сбрасывается после коммита, в старом массиве подписки ещё нет.
+    followers = follow_graph.get_followers(follow.author_id)
+    count = len(followers) + (
+        not follow_graph.contains(followers, follow.user_id))
+    if count >= TIMELINE_FANOUT_LIMIT:
+        # Автор стал слишком популярным: дальше его посты читаются
+        # напрямую, уже разложенные записи не мешают.
+        _change_pull_authors(added=[follow.author_id])
+        return
+    _backfill([follow.user_id], follow.author_id)
+
+
+def remove_follow(follow):
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id).delete()
+    pull_authors = get_pull_authors()
+    if follow.author_id not in pull_authors:
+        return
+    followers = follow_graph.get_followers(follow.author_id)
+    count = len(followers) - follow_graph.contains(followers, follow.user_id)
+    # Порог возврата ниже порога чтения напрямую, чтобы автор на границе
+    # не переключался туда и обратно с каждой подпиской. Разложить его
+    # посты по всем лентам — сотни тысяч строк, это делает фоновый поток.
+    if count < TIMELINE_FANOUT_RESUME:
+        author_id = follow.author_id
+        transaction.on_commit(
+            lambda: get_executor().submit(_resume_work, author_id))
+
+
+def resume_fan_out(author_id):
+    """Возвращает автора к раскладке его постов по лентам подписчиков.
+
+    Пока посты раскладываются, автор остаётся в чтении напрямую и лента
+    его подписчиков полна. Посты и подписки, которые появились за это
+    время, раскладка при публикации и подписке пропустила, поэтому после
+    переключения они дописываются отдельно.
+    """
+    started = timezone.now()
+    followers = list(follow_graph.get_followers(author_id))
+    if author_id not in get_pull_authors() or (
+            len(followers) >= TIMELINE_FANOUT_RESUME):
+        return
+    # По читателю за раз: каждая транзакция не больше
+    # TIMELINE_BACKFILL_POSTS строк.
+    for user_id in followers:
+        _backfill([user_id], author_id)
+    _change_pull_authors(removed=[author_id])
+    current = follow_graph.get_followers(author_id)
+    done = set(followers)
+    _backfill(
+        [user_id for user_id in current if user_id not in done], author_id)
+    _backfill(current, author_id, since=started)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # Свой поток, а не поток удалений: раскладка не ждёт за долгим
+        # удалением пользователя.
+        _executor = ThreadPoolExecutor(max_workers=1)
+    return _executor
+
+
+def _resume_work(author_id):
+    try:
+        resume_fan_out(author_id)
+    except DatabaseError:
+        # Автор остаётся в чтении напрямую, лента от этого не страдает.
+        logger.exception('Не удалось вернуть автора к раскладке')
+    finally:
+        connection.close()
+
+
+def _pulled_authors(user):
+    """Авторы читателя, чьи посты читаются напрямую."""
+    pull_authors = get_pull_authors()
+    if not pull_authors:
+        return []
+    return [
+        author_id for author_id in follow_graph.get_following(user.pk)
+        if author_id in pull_authors
+    ]
+
+
+def get_author_feed(user):
+    """Посты авторов, на которых подписан читатель."""
+    feed = Q(pk__in=user.timeline.values('post'))
+    pulled = _pulled_authors(user)
+    if pulled:
+        feed |= Q(author__in=pulled)
+    return feed
+
+
+def _posts_source(posts):
+    return posts.annotate(
+        **{FEED_KEY: F('pub_date'), FEED_PK: F('pk')}).for_feed()
+
+
+def get_follow_sources(user):
+    """Источники ленты подписок для слияния с ключом FEED_KEY, FEED_PK.
+
+    Разложенные посты листаются по индексу записей ленты (user, pub_date,
+    post): курсор и сортировка по столбцам записи, а не поста, и
+    страница читает только свои строки. Посты авторов, которые читаются
+    напрямую, и посты всех групп читателя — ещё по одному запросу.
+    """
+    sources = [
+        Post.objects.filter(timeline_entries__user=user).annotate(**{
+            FEED_KEY: F('timeline_entries__pub_date'),
+            FEED_PK: F('timeline_entries__post'),
+        }).for_feed()
+    ]
+    pulled = _pulled_authors(user)
+    if pulled:
+        sources.append(
+            _posts_source(Post.objects.filter(author_id__in=pulled)))
+    group_ids = list(GroupFollow.objects.filter(user=user).values_list(
+        'group', flat=True))
+    if group_ids:
+        sources.append(
+            _posts_source(Post.objects.filter(group_id__in=group_ids)))
+    return sources
+
+
+def get_follow_feed(user):
+    """Та же лента одним запросом, для листания по номерам страниц."""
+    return Post.objects.filter(
+        get_author_feed(user)
+        | Q(group__in=user.group_follows.values('group'))).for_feed()
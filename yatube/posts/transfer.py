@@ -0,0 +1,315 @@
+"""Потоковые экспорт и импорт в JSON Lines (файл .gz сжимается).
+
+Каждая строка — один объект с полем model. Пользователи и группы
+ссылаются по username и slug, посты и комментарии сохраняют свои pk,
+если в базе их не заняла другая строка.
+Экспорт идёт группами, постами, комментариями и подписками, чтобы при
+импорте ссылки уже находили свои объекты. Память не зависит от объёма:
+экспорт читает таблицы через iterator(), импорт пишет пачками.
+"""
+import gzip
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import search, stats, timeline, trending
+from .caching import SHARED_SCOPES, bump_generations
+from .models import Comment, Follow, Group, GroupFollow, Post, User
+
+# Модель: поля строки и пути к ним в ORM.
+EXPORTS = {
+    'group': (Group, {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'pk',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'views': 'views',
+    }),
+    'comment': (Comment, {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follow': (Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+    'group_follow': (GroupFollow, {
+        'user': 'user__username',
+        'group': 'group__slug',
+    }),
+}
+
+
+def open_stream(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def export_rows(name, batch_size):
+    model, fields = EXPORTS[name]
+    values = model.objects.order_by('pk').values_list(*fields.values())
+    for row in values.iterator(chunk_size=batch_size):
+        yield {'model': name, **dict(zip(fields, row))}
+
+
+def export(stream, names, batch_size):
+    """Пишет строки моделей в поток, возвращает число строк по моделям."""
+    counts = Counter()
+    for name in names:
+        for row in export_rows(name, batch_size):
+            # isoformat() сохраняет микросекунды, в отличие от
+            # DjangoJSONEncoder.
+            stream.write(json.dumps(
+                row, ensure_ascii=False,
+                default=lambda value: value.isoformat()))
+            stream.write('\n')
+            counts[name] += 1
+    return counts
+
+
+@contextmanager
+def original_dates():
+    """Отключает auto_now_add, иначе даты из файла заменятся текущей."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает строки пачками через bulk_create(ignore_conflicts=True).
+
+    Повторный импорт того же файла ничего не дублирует. Сигналы при
+    bulk_create не срабатывают, поэтому ленты подписок, поисковый индекс,
+    счётчики и популярная лента обновляются по каждой пачке, а поколения
+    кэша — в конце. id, затронутые пачкой, после неё забываются, так что
+    память импортёра не растёт с размером файла. До конца импорта
+    помнятся только новые pk постов, чей pk в базе был занят (post_map):
+    по ним находят свой пост комментарии.
+    """
+    def __init__(self, batch_size, media_from=None):
+        self.batch_size = batch_size
+        self.media_from = media_from
+        self.counts = Counter()
+        self.group_ids = {}
+        self.user_ids = set()
+        self.post_ids = set()
+        self.post_map = {}
+
+    def run(self, stream):
+        return self.load(
+            json.loads(line) for line in stream if line.strip())
+
+    def load(self, rows):
+        """Загружает строки-словари в том же формате, что и в файле."""
+        name, batch = None, []
+        with original_dates():
+            for number, row in enumerate(rows, 1):
+                if row.get('model') not in EXPORTS:
+                    raise ValueError(f'Объект {number}: неизвестная модель.')
+                if row['model'] != name or len(batch) == self.batch_size:
+                    self.flush(name, batch)
+                    name, batch = row['model'], []
+                batch.append(row)
+            self.flush(name, batch)
+        self.finish()
+        return self.counts
+
+    def flush(self, name, rows):
+        if not rows:
+            return
+        with transaction.atomic():
+            getattr(self, f'load_{name}')(rows)
+        for rebuild, ids in (
+                (stats.rebuild, self.user_ids),
+                (trending.rebuild, self.post_ids)):
+            ids = sorted(ids)
+            for start in range(0, len(ids), self.batch_size):
+                rebuild(ids[start:start + self.batch_size])
+        self.group_ids = {}
+        self.user_ids = set()
+        self.post_ids = set()
+        self.counts[name] += len(rows)
+
+    def finish(self):
+        bump_generations(('index',), *SHARED_SCOPES)
+
+    def users(self, usernames):
+        """id пользователей по username; недостающие создаются."""
+        usernames = set(usernames)
+        ids = dict(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        missing = usernames - set(ids)
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=name, password=password) for name in missing],
+                ignore_conflicts=True)
+            ids.update(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+        self.user_ids.update(ids.values())
+        return ids
+
+    def groups(self, slugs):
+        missing = set(slugs) - set(self.group_ids)
+        if missing:
+            self.group_ids.update(Group.objects.filter(
+                slug__in=missing).values_list('slug', 'pk'))
+        return self.group_ids
+
+    def image(self, name):
+        """Ссылка на картинку, если файл есть в хранилище или в media_from."""
+        if not name or default_storage.exists(name):
+            return name
+        source = self.media_from and os.path.join(self.media_from, name)
+        if source and os.path.isfile(source):
+            with open(source, 'rb') as file:
+                return default_storage.save(name, File(file))
+        self.counts['missing_images'] += 1
+        return ''
+
+    def insert(self, model, objects, fields):
+        """Создаёт объекты с pk из файла, возвращает {pk из файла: pk}.
+
+        Если pk уже занят строкой с другими значениями fields, объект
+        ищется по этим полям, а не найденный создаётся с новым pk: иначе
+        bulk_create молча пропустил бы его, а ссылки достались бы чужой
+        строке.
+        """
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        stored = {
+            pk: values for pk, *values in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]).values_list(
+                    'pk', *fields)
+        }
+        ids, conflicts = {}, []
+        for obj in objects:
+            if stored.get(obj.pk) == [getattr(obj, name) for name in fields]:
+                ids[obj.pk] = obj.pk
+            else:
+                conflicts.append((obj.pk, obj))
+                obj.pk = None
+
+        def find(obj):
+            return model.objects.filter(**{
+                name: getattr(obj, name) for name in fields
+            }).values_list('pk', flat=True).first()
+
+        model.objects.bulk_create(
+            [obj for _, obj in conflicts if find(obj) is None])
+        for file_id, obj in conflicts:
+            ids[file_id] = find(obj)
+        self.counts[f'remapped_{model._meta.model_name}s'] += len(conflicts)
+        return ids
+
+    def load_group(self, rows):
+        Group.objects.bulk_create(
+            [
+                Group(
+                    slug=row['slug'], title=row['title'],
+                    description=row['description'])
+                for row in rows
+            ],
+            ignore_conflicts=True,
+        )
+
+    def load_post(self, rows):
+        users = self.users(row['author'] for row in rows)
+        groups = self.groups(row['group'] for row in rows if row['group'])
+        ids = self.insert(
+            Post,
+            [
+                Post(
+                    pk=row['id'], text=row['text'],
+                    pub_date=parse_datetime(row['pub_date']),
+                    author_id=users[row['author']],
+                    group_id=groups.get(row['group']),
+                    image=self.image(row['image']),
+                    views=row.get('views', 0))
+                for row in rows
+            ],
+            ('author_id', 'pub_date'),
+        )
+        self.post_map.update(
+            (file_id, pk) for file_id, pk in ids.items() if file_id != pk)
+        # Читаем обратно: при повторном импорте в базе прежняя версия.
+        posts = list(Post.objects.filter(
+            pk__in=ids.values()).values_list(
+                'pk', 'author', 'pub_date', 'text'))
+        search.index_objects(
+            search.POST_INDEX, [(pk, text) for pk, _, _, text in posts])
+        timeline.fan_out_posts([post[:3] for post in posts])
+        self.post_ids.update(pk for pk, _, _, _ in posts)
+
+    def load_comment(self, rows):
+        users = self.users(row['author'] for row in rows)
+        post_ids = {
+            row['post']: self.post_map.get(row['post'], row['post'])
+            for row in rows
+        }
+        existing = set(Post.objects.filter(
+            pk__in=post_ids.values()).values_list('pk', flat=True))
+        self.post_ids.update(existing)
+        ids = self.insert(
+            Comment,
+            [
+                Comment(
+                    pk=row['id'], post_id=post_ids[row['post']],
+                    text=row['text'], author_id=users[row['author']],
+                    created=parse_datetime(row['created']))
+                for row in rows if post_ids[row['post']] in existing
+            ],
+            ('post_id', 'author_id', 'created'),
+        )
+        search.index_objects(
+            search.COMMENT_INDEX,
+            Comment.objects.filter(pk__in=ids.values()).values_list(
+                'pk', 'text'))
+
+    def load_follow(self, rows):
+        users = self.users(
+            name for row in rows for name in (row['user'], row['author']))
+        follows = [
+            Follow(user_id=users[row['user']], author_id=users[row['author']])
+            for row in rows if row['user'] != row['author']
+        ]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        timeline.add_follows(follows)
+
+    def load_group_follow(self, rows):
+        users = self.users(row['user'] for row in rows)
+        groups = self.groups(row['group'] for row in rows)
+        GroupFollow.objects.bulk_create(
+            [
+                GroupFollow(
+                    user_id=users[row['user']],
+                    group_id=groups[row['group']])
+                for row in rows if row['group'] in groups
+            ],
+            ignore_conflicts=True,
+        )
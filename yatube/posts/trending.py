@@ -0,0 +1,157 @@
+"""Популярная лента: рейтинг постов с затуханием по времени.
+
+Событие с весом w в момент t даёт вклад w * 2 ** ((t - EPOCH) / T), где
+T — TRENDING_HALF_LIFE. Вклады растут со временем вместо того, чтобы
+затухать, поэтому порядок постов совпадает с порядком по затухающему
+рейтингу, а старые значения никогда не пересчитываются. Чтобы числа не
+переполнялись, хранится логарифм суммы, и новое событие складывается с
+ним через logaddexp прямо в UPDATE, без чтения старого значения.
+
+Рейтинг обновляется при публикации поста, комментарии, подписке на
+автора (поднимаются его последние посты) и записи просмотров. rebuild()
+пересчитывает рейтинг с нуля по постам, комментариям и просмотрам. У
+подписок и просмотров в базе нет времени: подписки при пересчёте не
+учитываются, просмотры считаются сделанными в момент публикации.
+
+Миграция только создаёт таблицу: рейтинг уже существующих постов
+строит команда rebuild_trending.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone as django_timezone
+
+from .caching import bump_generations
+from .models import Comment, Post, TrendingScore
+from .settings import (
+    TRENDING_FOLLOW_POSTS, TRENDING_HALF_LIFE, TRENDING_WEIGHTS
+)
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+GROWTH = math.log(2) / TRENDING_HALF_LIFE
+
+
+def event_score(kind, when, count=1):
+    """Логарифм вклада count событий вида kind в момент when."""
+    return (
+        math.log(TRENDING_WEIGHTS[kind] * count)
+        + GROWTH * (when - EPOCH).total_seconds()
+    )
+
+
+def logaddexp(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def combine(events):
+    """Сводит пары (post_id, вклад) в {post_id: рейтинг}."""
+    scores = {}
+    for post_id, score in events:
+        scores[post_id] = (
+            logaddexp(scores[post_id], score) if post_id in scores
+            else score
+        )
+    return scores
+
+
+def collect(posts, comments):
+    """Рейтинги с нуля по (pk, pub_date, views) и (post_id, created)."""
+    events = []
+    for pk, pub_date, views in posts:
+        events.append((pk, event_score('post', pub_date)))
+        if views:
+            events.append((pk, event_score('view', pub_date, views)))
+    events += (
+        (post_id, event_score('comment', created))
+        for post_id, created in comments
+    )
+    return combine(events)
+
+
+def _raise(rows, score):
+    """Складывает рейтинг строк с вкладом score одним UPDATE в базе."""
+    score = Value(score, output_field=FloatField())
+    high = Greatest(F('score'), score)
+    low = Least(F('score'), score)
+    rows.update(score=high + Ln(1 + Exp(low - high)))
+
+
+def add(events):
+    """Прибавляет вклады пар (post_id, вклад) к рейтингам постов."""
+    posts = defaultdict(list)
+    for post_id, score in combine(events).items():
+        posts[score].append(post_id)
+    for score, post_ids in posts.items():
+        _raise(TrendingScore.objects.filter(post_id__in=post_ids), score)
+    if posts:
+        bump_generations(('trending',))
+
+
+def add_post(post):
+    TrendingScore.objects.create(
+        post=post, score=event_score('post', post.pub_date))
+    bump_generations(('trending',))
+
+
+def add_comment(comment):
+    add([(comment.post_id, event_score('comment', comment.created))])
+
+
+def add_follow(follow):
+    latest = Post.objects.filter(author_id=follow.author_id).order_by(
+        '-pub_date').values('pk')[:TRENDING_FOLLOW_POSTS]
+    _raise(
+        TrendingScore.objects.filter(post__in=latest),
+        event_score('follow', django_timezone.now()))
+    bump_generations(('trending',))
+
+
+def add_views(counts):
+    """Вклад просмотров {post_id: число}, записанных в базу."""
+    now = django_timezone.now()
+    add(
+        (post_id, event_score('view', now, count))
+        for post_id, count in counts.items()
+    )
+
+
+def rebuild(post_ids):
+    posts = Post.objects.filter(pk__in=post_ids).values_list(
+        'pk', 'pub_date', 'views')
+    comments = Comment.objects.filter(post_id__in=post_ids).values_list(
+        'post', 'created')
+    scores = collect(posts, comments)
+    with transaction.atomic():
+        TrendingScore.objects.filter(post_id__in=post_ids).delete()
+        TrendingScore.objects.bulk_create(
+            TrendingScore(post_id=pk, score=score)
+            for pk, score in scores.items())
+    bump_generations(('trending',))
+
+
+def rebuild_all(batch_size):
+    post_ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+    batch = []
+    for post_id in post_ids.iterator():
+        batch.append(post_id)
+        if len(batch) == batch_size:
+            rebuild(batch)
+            yield len(batch)
+            batch = []
+    if batch:
+        rebuild(batch)
+        yield len(batch)
+
+
+def get_trending_page(page_obj):
+    """Подменяет строки рейтинга на странице постами для ленты."""
+    posts = Post.objects.for_feed().in_bulk([row.pk for row in page_obj])
+    page_obj.object_list = [
+        posts[row.pk] for row in page_obj if row.pk in posts
+    ]
+    return page_obj
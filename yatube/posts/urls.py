@@ -11,11 +11,27 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/follow/',
+        views.group_follow,
+        name='group_follow',
+    ),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow',
+    ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('trending/', views.trending, name='trending'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -0,0 +1,138 @@
+"""Счётчики просмотров постов с накоплением в памяти процесса.
+
+Просмотр — это только прибавление к Counter под блокировкой. Накопленные
+приращения пишутся в базу одним UPDATE на каждое различное значение,
+когда просмотров набралось VIEWS_FLUSH_THRESHOLD или через
+VIEWS_FLUSH_INTERVAL секунд после первого несброшенного просмотра: это
+время отмеряет фоновый таймер, так что пачка пишется и без новых
+просмотров. UPDATE идёт через queryset, поэтому edited поста и его
+кэшированный HTML не меняются. При остановке процесса теряется не больше
+одной несброшенной пачки.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+from . import identity, trending
+from .caching import bump_generations
+from .models import Post
+from .settings import VIEWS_FLUSH_INTERVAL, VIEWS_FLUSH_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.total = 0
+        self.flushed_at = time.monotonic()
+        self.timer = None
+
+    def add(self, post_id):
+        with self.lock:
+            self.pending[post_id] += 1
+            self.total += 1
+            due = (
+                self.total >= VIEWS_FLUSH_THRESHOLD
+                or time.monotonic() - self.flushed_at >= VIEWS_FLUSH_INTERVAL
+            )
+            self._schedule()
+        if due:
+            self.flush()
+
+    def _schedule(self):
+        # Вызывается под блокировкой; один таймер на процесс.
+        if self.timer is None and self.pending:
+            self.timer = threading.Timer(
+                VIEWS_FLUSH_INTERVAL, self._flush_on_timer)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _flush_on_timer(self):
+        with self.lock:
+            self.timer = None
+        try:
+            self.flush()
+        finally:
+            # Соединение потока таймера больше никому не нужно.
+            connection.close()
+        with self.lock:
+            # Не записалось или набралось новое — таймер заводится снова.
+            self._schedule()
+
+    def get(self, post_id):
+        return self.pending.get(post_id, 0)
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.total = 0
+            self.flushed_at = time.monotonic()
+        return pending
+
+    def restore(self, pending):
+        with self.lock:
+            self.pending.update(pending)
+            self.total += sum(pending.values())
+
+    def flush(self):
+        """Пишет накопленное в базу, возвращает {post_id: приращение}."""
+        pending = self.take()
+        if not pending:
+            return pending
+        try:
+            write(pending)
+        except DatabaseError:
+            # База занята: попробуем со следующей пачкой.
+            logger.exception('Не удалось записать просмотры')
+            self.restore(pending)
+            return Counter()
+        return pending
+
+
+def write(pending):
+    posts = defaultdict(list)
+    for post_id, delta in pending.items():
+        posts[delta].append(post_id)
+    with transaction.atomic():
+        for delta, post_ids in posts.items():
+            Post.objects.filter(pk__in=post_ids).update(
+                views=F('views') + delta)
+    # Страницы постов с новым числом просмотров перестают отвечать 304.
+    bump_generations(*(('post', post_id) for post_id in pending))
+    identity.forget('post', *pending)
+    trending.add_views(pending)
+
+
+buffer = ViewBuffer()
+
+
+def get_views(post):
+    """Просмотры поста с учётом ещё не записанных в этом процессе.
+
+    Буфер у каждого процесса свой: просмотры, накопленные другими
+    воркерами, видны только после их записи, то есть с отставанием не
+    больше VIEWS_FLUSH_INTERVAL секунд.
+    """
+    return post.views + buffer.get(post.pk)
+
+
+def flush():
+    return buffer.flush()
+
+
+def count_views(view):
+    """Считает показ поста, в том числе ответ 304 Not Modified."""
+    @wraps(view)
+    def wrapper(request, post_id, *args, **kwargs):
+        response = view(request, post_id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            buffer.add(post_id)
+        return response
+    return wrapper
@@ -1,61 +1,163 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, redirect, render
 
+from .caching import conditional_page, feed_cache_key
+from .follow_graph import is_following
+from .identity import find_group, find_post, find_user, get_or_404
 from .forms import CommentForm, PostForm
-from .models import Follow, Post, Group, User
-from .settings import COUNT_POSTS_IN_PAGE
+from .models import (
+    Comment, Follow, GroupFollow, Post, TrendingScore
+)
+from .paginators import get_cursor_page
+from .search import search_posts
+from .settings import COUNT_COMMENTS_IN_PAGE, COUNT_POSTS_IN_PAGE
+from .stats import get_user_stats
+from .thumbnails import enqueue_thumbnails
+from .timeline import (
+    FEED_KEY, FEED_PK, get_follow_feed, get_follow_sources
+)
+from .trending import get_trending_page
+from .view_counts import count_views, get_views
 
 
-def get_page_obj(request, posts):
-    return Paginator(
-        posts, COUNT_POSTS_IN_PAGE).get_page(
-            request.GET.get('page'))
+def get_page_obj(request, posts, key='pub_date', pk='pk'):
+    # Старые ссылки ?page=N продолжают работать, остальные страницы
+    # листаются курсором ?after=/?before= без COUNT и OFFSET.
+    if 'page' in request.GET:
+        return Paginator(
+            posts, COUNT_POSTS_IN_PAGE).get_page(
+                request.GET.get('page'))
+    return get_cursor_page(request, posts, COUNT_POSTS_IN_PAGE, key, pk)
 
 
-# @cache_page(20, key_prefix='index_page')
+def index_scopes(request):
+    return [('index',)]
+
+
+def group_scopes(request, slug):
+    group = find_group(slug)
+    if group is not None:
+        return [('group', group.pk), ('group_follows', request.user.pk)]
+
+
+def profile_scopes(request, username):
+    author = find_user(username)
+    if author is not None:
+        return [('profile', author.pk), ('stats', author.pk)]
+
+
+def post_scopes(request, post_id):
+    post = find_post(post_id)
+    if post is not None:
+        return [('post', post_id), ('stats', post.author_id)]
+
+
+@conditional_page(index_scopes)
 def index(request):
-    return render(
-        request,
-        'posts/index.html',
-        {'page_obj': get_page_obj(request, Post.objects.all())})
+    context = {
+        'page_obj': get_page_obj(request, Post.objects.for_feed()),
+        'feed_key': feed_cache_key(request, 'index'),
+    }
+    return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_or_404('group', slug)
+    following = (
+        request.user.is_authenticated
+        and group.followers.filter(user=request.user).exists()
+    )
     context = {
         'group': group,
-        'page_obj': get_page_obj(request, group.posts.all()),
+        'following': following,
+        'page_obj': get_page_obj(request, group.posts.for_feed()),
+        'feed_key': feed_cache_key(request, 'group', group.pk),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_or_404('user', username)
     following = (
         request.user.is_authenticated
         and request.user.username != username
-        and Follow.objects.filter(
-            user=request.user,
-            author=author
-        ).exists()
+        and is_following(request.user.pk, author.pk)
     )
     context = {
         'author': author,
-        'page_obj': get_page_obj(request, author.posts.all()),
+        'stats': get_user_stats(author),
+        'page_obj': get_page_obj(request, author.posts.for_feed()),
+        'feed_key': feed_cache_key(request, 'profile', author.pk),
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+def trending_scopes(request):
+    return [('trending',)]
+
+
+@conditional_page(trending_scopes)
+def trending(request):
+    context = {
+        'page_obj': get_trending_page(
+            get_page_obj(request, TrendingScore.objects.all(), 'score')),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(
+        search_posts(query) if query else [],
+        COUNT_POSTS_IN_PAGE).get_page(request.GET.get('page'))
+    # Ранжированы только pk, сами посты страницы читаем одним запросом.
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def get_comments_page(request, post_id):
+    return get_cursor_page(
+        request, Comment.objects.filter(post_id=post_id).for_display(),
+        COUNT_COMMENTS_IN_PAGE, key='created')
+
+
+@count_views
+@conditional_page(post_scopes)
 def post_detail(request, post_id):
+    post = get_or_404('post', post_id)
     context = {
-        'post': get_object_or_404(Post, pk=post_id),
+        'post': post,
+        'views': get_views(post),
+        'comments': get_comments_page(request, post_id),
+        'stats': get_user_stats(post.author),
         'form': CommentForm(request.POST or None),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки на странице поста."""
+    get_or_404('post', post_id)
+    context = {
+        'post_id': post_id,
+        'comments': get_comments_page(request, post_id),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -68,13 +170,16 @@ def post_create(request):
     new_post = form.save(commit=False)
     new_post.author = request.user
     new_post.save()
+    enqueue_thumbnails(new_post)
     return redirect('posts:profile', request.user.username)
 
 
 @login_required
 def post_edit(request, post_id):
+    # Форма сохраняет все поля, поэтому правим свежую строку, а не
+    # объект из кэша с устаревшими просмотрами.
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -83,6 +188,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            enqueue_thumbnails(post)
         return redirect('posts:post_detail', post.pk)
     context = {
         'form': form,
@@ -94,7 +201,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_or_404('post', post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -106,10 +213,15 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
+    # Номера страниц листают ленту одним запросом, курсор — слиянием
+    # источников.
+    if 'page' in request.GET:
+        page_obj = get_page_obj(request, get_follow_feed(request.user))
+    else:
+        page_obj = get_page_obj(
+            request, get_follow_sources(request.user), FEED_KEY, FEED_PK)
     context = {
-        'page_obj': get_page_obj(
-            request, Post.objects.filter(
-                author__following__user=request.user)),
+        'page_obj': page_obj,
         'author': request.user
     }
     return render(request, 'posts/follow.html', context)
@@ -117,13 +229,9 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if ((username != request.user.username) and (not Follow.objects.filter(
-            user=request.user,
-            author=author).exists())):
-        Follow.objects.create(
-            user=request.user,
-            author=author)
+    author = get_or_404('user', username)
+    if username != request.user.username:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
@@ -132,5 +240,19 @@ def profile_unfollow(request, username):
     get_object_or_404(
         Follow,
         user=request.user,
-        author__username=username).delete()
+        author=get_or_404('user', username)).delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def group_follow(request, slug):
+    group = get_or_404('group', slug)
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug=slug)
+
+
+@login_required
+def group_unfollow(request, slug):
+    GroupFollow.objects.filter(
+        user=request.user, group__slug=slug).delete()
+    return redirect('posts:group_list', slug=slug)
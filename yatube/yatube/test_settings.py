@@ -0,0 +1,25 @@
+"""Настройки тестов.
+
+Тесты не делят файл кэша с сервером на той же машине: прогон берёт
+пустой файл во временном каталоге, а процессы миниатюр, которые он
+запускает, находят тот же файл через окружение.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+TEST_CACHE_ENV = 'YATUBE_TEST_CACHE'
+if TEST_CACHE_ENV not in os.environ:
+    _cache_dir = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+    os.environ[TEST_CACHE_ENV] = os.path.join(_cache_dir, 'cache.sqlite3')
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': os.environ[TEST_CACHE_ENV],
+    },
+}